@@ -1,6 +1,20 @@
-from table2string.table2string import print_table, stringify_table, Table  # noqa
+from table2string.table2string import (  # noqa
+    print_table,
+    stringify_table,
+    iter_table_lines,
+    render_many,
+    TableLayout,
+    TablePaginator,
+    SubTableCache,
+    WidthSample,
+    Table,
+)
 from table2string.themes import Border, Theme, Themes  # noqa
-from table2string.utils import terminal_size  # noqa
+from table2string.utils import (  # noqa
+    terminal_size,
+    WidthCache,
+    set_width_cache,
+)
 from table2string.aligns import HorizontalAlignment, VerticalAlignment  # noqa
 from table2string.text_styles import style, link, Color, BgColor  # noqa
 from table2string.text_splitters import (  # noqa
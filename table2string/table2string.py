@@ -1,6 +1,13 @@
-import csv
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import deque
+from itertools import chain, islice
 from io import TextIOWrapper, StringIO
-from typing import Any, Sequence, Iterable, cast
+from typing import Any, Sequence, Iterable, Iterator, NamedTuple, TypeVar, cast
+
+# csv, random and concurrent.futures are imported where they are used,
+# so that importing table2string is faster
 
 from table2string.themes import Theme, Themes
 from table2string.aligns import HorizontalAlignment, VerticalAlignment
@@ -14,12 +21,156 @@ from table2string.utils import (
     transform_align,
     transform_width,
     transform_value,
+    use_width_cache,
+    WidthCache,
+    LineWriter,
     fill_line,
+    is_number,
+)
+
+
+T = TypeVar("T")
+
+
+class ColumnStats(NamedTuple):
+    widths: tuple[int, ...]
+    min_widths: tuple[int, ...]
+
+
+class SubTableCache:
+    """
+    Rendered subtables and their column widths.
+    Shared or repeated subtables are rendered and measured only once.
+
+    Each call uses its own cache by default. A cache passed explicitly
+    can be reused between calls, but the subtables are keyed by the object,
+    so after changing a subtable in place the cache must be cleared.
+    A cache shared between threads may render a subtable more than once
+    and its hits and misses are approximate.
+
+    EXAMPLE
+
+    cache = SubTableCache()
+    print_table(table, sub_table_cache=cache)
+    cache.hits, cache.misses
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.stats: dict[Any, ColumnStats] = {}
+        self.lines: dict[
+            tuple, tuple[list[str], list[str], bool, dict[str, tuple[str, ...]]]
+        ] = {}
+
+    def clear(self) -> None:
+        """
+        Removes all cached subtables and resets the statistics
+        """
+        self.stats.clear()
+        self.lines.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f"SubTableCache(stats={len(self.stats)}, lines={len(self.lines)})"
+
+
+class WidthSample:
+    """
+    Rows of the table used to calculate the widths of the columns.
+    The layout of a huge table is calculated from the sample instead of every cell.
+    Longer values outside the sample are wrapped or cut like any other value,
+    and subtables wider than their column are clipped.
+
+    Strategies:
+    "head" - the first `size` rows
+    "random" - `size` random rows, the same rows for the same `seed`
+    "quantiles" - `size` evenly spaced rows including the first and the last rows
+
+    EXAMPLE
+
+    print_table(table, width_sample=WidthSample(1000, "quantiles"))
+    """
+
+    strategies = ("head", "random", "quantiles")
+
+    def __init__(
+        self, size: int = 100, strategy: str = "head", seed: int | None = None
+    ) -> None:
+        if size < 1:
+            raise ValueError(f"size={size}")
+
+        if strategy not in self.strategies:
+            raise ValueError(f"strategy={strategy!r}")
+
+        self.size = size
+        self.strategy = strategy
+        self.seed = seed
+
+    def select(self, table: Sequence[T]) -> list[T]:
+        """
+        :param table: Rows of the table
+        :return: Sampled rows in the order of the table
+        """
+        size = self.size
+        if len(table) <= size:
+            return list(table)
+
+        if self.strategy == "head":
+            indexes: Iterable[int] = range(size)
+        elif self.strategy == "random":
+            import random
+
+            indexes = sorted(random.Random(self.seed).sample(range(len(table)), size))
+        elif size == 1:
+            indexes = (0,)
+        else:
+            last_index = len(table) - 1
+            indexes = sorted({round(i * last_index / (size - 1)) for i in range(size)})
+        return [table[i] for i in indexes]
+
+    def __repr__(self):
+        return (
+            f"WidthSample({self.size}, {self.strategy!r}"
+            + (f", seed={self.seed!r}" if self.seed is not None else "")
+            + ")"
+        )
+
+
+call_sub_table_cache: ContextVar[SubTableCache | None] = ContextVar(
+    "call_sub_table_cache", default=None
 )
 
 
+def get_sub_table_cache(cache: SubTableCache | None = None) -> SubTableCache:
+    """
+    :param cache: SubTableCache or None
+    :return: `cache`, the cache of the current call or a new cache
+    """
+    if cache is None:
+        cache = call_sub_table_cache.get()
+    if cache is None:
+        cache = SubTableCache()
+    return cache
+
+
+@contextmanager
+def use_sub_table_cache(cache: SubTableCache | None) -> Iterator[None]:
+    """
+    Enables the subtable cache inside the `with` block
+
+    :param cache: SubTableCache or None
+    """
+    token = call_sub_table_cache.set(cache)
+    try:
+        yield
+    finally:
+        call_sub_table_cache.reset(token)
+
+
 def print_table(
-    table: Sequence[Sequence[Any]],
+    table: Sequence[Sequence[Any]] | Iterable[Sequence[Any]],
     *,
     h_align: (
         tuple[HorizontalAlignment | str, ...] | HorizontalAlignment | str
@@ -45,6 +196,12 @@ def print_table(
     max_width: int | tuple[int, ...] | None = None,
     max_height: int | None = None,
     maximize_height: bool = False,
+    max_chars: int | tuple[int | None, ...] | None = None,
+    max_rows: int | None = None,
+    width_sample: int | WidthSample | None = None,
+    workers: int | None = None,
+    split_columns: bool = False,
+    repeat_columns: tuple[int, ...] = (),
     line_break_symbol: str = "/",
     cell_break_symbol: str = "…",
     sep: bool | range | tuple = True,
@@ -53,6 +210,11 @@ def print_table(
     theme: Theme = Themes.ascii_thin,
     ignore_width_errors: bool = False,
     proportion_coefficient: float = 0.5,
+    width_cache: WidthCache | None = None,
+    sub_table_cache: SubTableCache | None = None,
+    stream: bool = False,
+    stream_sample_size: int = 100,
+    buffer_size: int = 65536,
 ) -> None:
     """
     Print the table in sys.stdout or file
@@ -75,6 +237,19 @@ def print_table(
     :param max_width: Table width or width of individual columns
     :param max_height: The maximum number of lines in one line
     :param maximize_height: Make all lines of the same height max_height
+    :param max_chars: Maximum number of characters of a cell value, for all columns
+        or for each column. Longer values are cut before measuring and splitting
+        and end with cell_break_symbol
+    :param max_rows: Show only the first and the last rows. The row with
+        the number of omitted rows is between them. The widths are calculated
+        from the shown rows
+    :param width_sample: Calculate the widths of the columns from a sample of rows
+        (see WidthSample). An int is the number of the first rows
+    :param workers: Number of processes that format the rows in chunks.
+        The rows must be picklable. None formats the rows in the current process
+    :param split_columns: Split the columns that do not fit in max_width (int)
+        into several tables one under another instead of narrowing all columns
+    :param repeat_columns: Indexes of the columns repeated in each table of split_columns
     :param line_break_symbol: "\\" or "↩" or chr(8617) or "\\U000021a9"
     :param cell_break_symbol: "…" or chr(8230) or "\\U00002026"
     :param sep: Settings of dividers. You can specify specific lines with dividers
@@ -83,317 +258,60 @@ def print_table(
     :param theme: Theme
     :param ignore_width_errors: Fixes errors in max_width if they exist
     :param proportion_coefficient: Reduction coefficient for too large numbers
+    :param width_cache: Width cache for this call (see utils.WidthCache)
+    :param sub_table_cache: Cache of rendered subtables for this call (see SubTableCache)
+    :param stream: Do not materialize the table. Column widths are calculated
+        from the first `stream_sample_size` rows (or taken from max_width if it is a tuple)
+        and each row is written to the file as soon as it is formatted.
+        Longer values outside the sample are wrapped, wider subtables are clipped.
+        All rows must have the same number of columns
+    :param stream_sample_size: Number of rows to look ahead in stream mode
+    :param buffer_size: The table is written to the file in blocks
+        of at least this many characters. If 0, each line is written immediately
     :return: None
     """
-    list_table: list[list[str | Table | Any]] = list(list(row) for row in table)
-    column_names_list: list[str | Table | Any] = (
-        list(column_names) if column_names else []
-    )
-
-    # Raise errors
-    if not any(list_table) or not sum(
-        hasattr(row, "__getitem__") for row in list_table
-    ):
-        raise ValueError(list_table)
-
-    if column_names_list and not (column_names_list and column_names_list[0]):
-        raise ValueError(column_names_list)
-
-    if max_height < 1 if max_height is not None else False:
-        raise ValueError(max_height)
-
-    if len(line_break_symbol) != 1 or not line_break_symbol.isprintable():
-        raise ValueError(f"line_break_symbol={line_break_symbol!r}")
-
-    if len(cell_break_symbol) != 1 or not cell_break_symbol.isprintable():
-        raise ValueError(f"cell_break_symbol={cell_break_symbol!r}")
-
-    if not isinstance(theme, Theme):
-        raise TypeError(theme)
-
-    column_count = max(map(len, list_table))
-    column_names_splitter_t = transform_value(column_names_splitter, column_count)
-    text_splitter_t = transform_value(text_splitter, column_count)
-
-    row_widths = get_column_widths(list_table, splitters=text_splitter_t)
-
-    # If there are column names, we write them at the beginning of the table
-    if column_names_list:
-        column_names_len = len(column_names_list)
-
-        if column_names_len > column_count:
-            column_names_list = column_names_list[: column_names_len - 1]
-        else:
-            column_names_list.extend((" ",) * (column_count - column_names_len))
-
-        list_table.insert(0, column_names_list)
-        column_names_widths = get_column_widths(
-            [column_names_list],
-            splitters=column_names_splitter_t,
-        )
-        row_widths = tuple(
-            max(rw, column_names_widths[irw]) for irw, rw in enumerate(row_widths)
-        )
-
-    min_row_widths = get_column_widths(
-        list_table,
-        splitters=transform_value(BaseTextSplitter(), column_count),
-        minimum=True,
-    )
-
-    if max_width is not None:
-        min_width = sum(min_row_widths) + 3 * column_count + 1
-        if isinstance(max_width, int):
-            if max_width < min_width:
-                if ignore_width_errors:
-                    max_width = min_width
-                else:
-                    raise ValueError(f"{max_width} >= {min_width}")
-        else:
-            invalid_widths = [mw for mw in max_width if mw < 1]
-            if invalid_widths:
-                if ignore_width_errors:
-                    max_width = tuple(1 if mw < 1 else mw for mw in max_width)
-                else:
-                    raise ValueError(
-                        f"Values in {invalid_widths} from max_width are less than one"
-                    )
-            max_width = max_width[:column_count]
-            max_width = (
-                *max_width,
-                *(max_width[-1],) * (column_count - len(max_width)),
-            )
-            sum_max_width = sum(max_width) + 3 * column_count + 1
-            if sum_max_width < min_width:
-                if ignore_width_errors:
-                    max_width = proportional_change(
-                        row_widths,
-                        sum(max_width) + (min_width - sum_max_width),
-                        min_row_widths,
-                    )
-                else:
-                    raise ValueError(
-                        f"{sum_max_width} >= {min_width}: "
-                        f"Increase the sum of max_width by {min_width - sum_max_width}"
-                    )
-
-            incorrect_max_widths = tuple(
-                max_w
-                for max_w, min_w in zip(max_width, min_row_widths)
-                if max_w < min_w
-            )
-            if incorrect_max_widths:
-                if ignore_width_errors:
-                    max_width = tuple(
-                        max(max_w, min_w)
-                        for max_w, min_w in zip(max_width, min_row_widths)
-                    )
-                else:
-                    raise ValueError(
-                        f"Values in {max_width} must be greater than or equal "
-                        f"to the corresponding values from {min_row_widths}. "
-                        f"Incorrect values: {incorrect_max_widths}"
-                    )
-
-    h_align_t = transform_align(column_count, h_align)
-    name_h_align_t = transform_align(1, name_h_align)
-    column_names_h_align_t = transform_align(column_count, column_names_h_align)
-
-    v_align_t = transform_align(column_count, v_align, default="^")
-    name_v_align_t = transform_align(1, name_v_align, default="^")
-    column_names_v_align_t = transform_align(
-        column_count, column_names_v_align, default="^"
-    )
-
-    max_widths = transform_width(
-        max_width, column_count, row_widths, min_row_widths, proportion_coefficient
+    lines = iter_table_lines(
+        table=table,
+        h_align=h_align,
+        v_align=v_align,
+        text_splitter=text_splitter,
+        name=name,
+        name_h_align=name_h_align,
+        name_v_align=name_v_align,
+        name_splitter=name_splitter,
+        column_names=column_names,
+        column_names_h_align=column_names_h_align,
+        column_names_v_align=column_names_v_align,
+        column_names_splitter=column_names_splitter,
+        max_width=max_width,
+        max_height=max_height,
+        maximize_height=maximize_height,
+        max_chars=max_chars,
+        max_rows=max_rows,
+        width_sample=width_sample,
+        workers=workers,
+        split_columns=split_columns,
+        repeat_columns=repeat_columns,
+        line_break_symbol=line_break_symbol,
+        cell_break_symbol=cell_break_symbol,
+        sep=sep,
+        theme=theme,
+        ignore_width_errors=ignore_width_errors,
+        proportion_coefficient=proportion_coefficient,
+        width_cache=width_cache,
+        sub_table_cache=sub_table_cache,
+        stream=stream,
+        stream_sample_size=stream_sample_size,
     )
-    (
-        up_separator,
-        under_name_separator,
-        up_noname_separator,
-        line_separator,
-        line_separator_plus,
-        down_separator,
-    ) = generate_borders(theme, max_widths)
-
-    rows: tuple[list[str], ...]
-    symbols: tuple[list[str], ...]
-    subtable_columns: tuple[bool, ...]
-    border_data_list: tuple[dict[str, tuple[str, ...]], ...]
-
-    if name:
-        if up_separator.strip():
-            print(up_separator, file=file)
-
-        max_name_width = sum(max_widths) + (3 * column_count) + 1 - 4
-
-        rows, symbols, subtable_columns, border_data_list = cast(
-            tuple[
-                tuple[list[str], ...],
-                tuple[list[str], ...],
-                tuple[bool, ...],
-                tuple[dict[str, tuple[str, ...]], ...],
-            ],
-            zip(
-                name_splitter.split_text(
-                    text=name,
-                    width=max_name_width,
-                    height=max_height,
-                    line_break_symbol=line_break_symbol,
-                    cell_break_symbol=cell_break_symbol,
-                )
-            ),
-        )
-        print(
-            fill_line(
-                columns_lines=rows,
-                columns_symbols=symbols,
-                subtable_columns=subtable_columns,
-                border_data_list=border_data_list,
-                widths=(max_name_width,),
-                h_align=name_h_align_t,
-                v_align=name_v_align_t,
-                theme=theme,
-            ),
-            file=file,
-        )
-
-    previous_border_data: tuple[dict[str, tuple[str, ...]], ...] = ({"": ("",)},)
-
-    for ri, row in enumerate(list_table):
-        if ri != 0:
-            print("", file=file, end="\n")
-
-        splitted_row: list[
-            tuple[list[str], list[str], bool, dict[str, tuple[str, ...]]]
-        ] = []
-
-        # Trimming long lines
-        for ci, column in enumerate(row):
-            if isinstance(column, Table):
-                string_sub_table = column.stringify(
-                    h_align=h_align_t[ci],
-                    v_align=v_align_t[ci],
-                    name_h_align=name_h_align,
-                    name_v_align=name_v_align,
-                    column_names_h_align=column_names_h_align,
-                    column_names_v_align=column_names_v_align,
-                    max_width=max_widths[ci] + 4,
-                    line_break_symbol=line_break_symbol,
-                    cell_break_symbol=cell_break_symbol,
-                    theme=theme.custom_sub_table_theme,
-                    ignore_width_errors=True,
-                    proportion_coefficient=proportion_coefficient,
-                )
-                column_lines = split_text_for_sub_table(string_sub_table, max_height)
-            else:
-                splitter = (
-                    column_names_splitter_t
-                    if ri == 0 and column_names_list
-                    else text_splitter_t
-                )
-                column_lines = splitter[ci].split_text(
-                    text=str(column),
-                    width=max_widths[ci],
-                    height=max_height,
-                    line_break_symbol=line_break_symbol,
-                    cell_break_symbol=cell_break_symbol,
-                )
-            splitted_row.append(column_lines)
-
-        if maximize_height and max_height:
-            max_row_height = max_height
-        else:
-            max_row_height = max(map(len, tuple(zip(*splitted_row))[0]))
-
-        for ci, column in enumerate(splitted_row):
-            if column[2]:  # is subtable
-                border_data: dict = column[3]
-                string = (
-                    " "
-                    + "".join(
-                        (
-                            theme.border.vertical
-                            if symbol == theme.border.bottom_horizontal
-                            else " "
-                        )
-                        for symbol in border_data["border_bottom"]
-                    )
-                    + " "
-                )
-                extend_data = (string,) * (max_row_height - len(column[0]))
-            else:
-                extend_data = (" ",) * (max_row_height - len(column[0]))
-            column[0].extend(extend_data)
-            column[1].extend(extend_data)
-
-        rows, symbols, subtable_columns, border_data_list = zip(*splitted_row)
-
-        if (
-            (sep is True or ri == 0)  # under table name
-            or (column_names_list and ri == 1)  # under column names
-            or (
-                isinstance(sep, (range, tuple))
-                and (ri - 1 in sep if column_names_list else ri in sep)
-            )  # if sep allows
-        ):
-            if ri == 0:
-                # separator under table name
-                s = under_name_separator if name else up_noname_separator
-                ha = column_names_h_align_t if column_names_list else h_align_t
-                va = column_names_v_align_t if column_names_list else v_align_t
-            elif ri == 1:
-                # separator under column names (if theme supports)
-                s = line_separator_plus
-                ha, va = h_align_t, v_align_t
-            else:
-                # normal separator
-                s = line_separator
-                ha, va = h_align_t, v_align_t
-
-            if s.strip():
-                # connect the borders from above
-                s = apply_border_data(
-                    s, "border_top", theme, border_data_list, max_widths
-                )
-                # if possible, connect the borders from below.
-                if ri > 0:
-                    s = apply_border_data(
-                        s, "border_bottom", theme, previous_border_data, max_widths
-                    )
-                print(s, file=file, end="\n")
-        else:
-            ha, va = h_align_t, v_align_t
-
-        line = fill_line(
-            columns_lines=rows,
-            columns_symbols=symbols,
-            subtable_columns=subtable_columns,
-            border_data_list=border_data_list,
-            widths=max_widths,
-            h_align=ha,
-            v_align=va,
-            theme=theme,
-        )
-        print(line, file=file, end="")
-        previous_border_data = border_data_list
-
-    if down_separator.strip():
-        s = apply_border_data(
-            down_separator.rstrip("\n"),
-            "border_bottom",
-            theme,
-            previous_border_data,
-            max_widths,
-        )
-        print("\n" + s, file=file, end=end)
-    elif end:
-        print("", file=file, end=end)
+    writer = LineWriter(file or sys.stdout, buffer_size)
+    for line in lines:
+        writer.write_line(line)
+    writer.write("\n" if end is None else end)
+    writer.flush()
 
 
-def stringify_table(
-    table: Sequence[Sequence[Any]],
+def iter_table_lines(
+    table: Sequence[Sequence[Any]] | Iterable[Sequence[Any]],
     *,
     h_align: (
         tuple[HorizontalAlignment | str, ...] | HorizontalAlignment | str
@@ -401,11 +319,11 @@ def stringify_table(
     v_align: (
         tuple[VerticalAlignment | str, ...] | VerticalAlignment | str
     ) = VerticalAlignment.TOP,
-    text_splitter: BaseTextSplitter | tuple[BaseTextSplitter, ...] = BaseTextSplitter(),
+    text_splitter: BaseTextSplitter | tuple[BaseTextSplitter, ...] = AnsiTextSplitter(),
     name: str | None = None,
     name_h_align: HorizontalAlignment | str = HorizontalAlignment.CENTER,
     name_v_align: VerticalAlignment | str = VerticalAlignment.MIDDLE,
-    name_splitter: BaseTextSplitter = BaseTextSplitter(),
+    name_splitter: BaseTextSplitter = AnsiTextSplitter(),
     column_names: Sequence[str] | None = None,
     column_names_h_align: (
         tuple[HorizontalAlignment | str, ...] | HorizontalAlignment | str
@@ -415,19 +333,30 @@ def stringify_table(
     ) = VerticalAlignment.MIDDLE,
     column_names_splitter: (
         BaseTextSplitter | tuple[BaseTextSplitter, ...]
-    ) = BaseTextSplitter(),
+    ) = AnsiTextSplitter(),
     max_width: int | tuple[int, ...] | None = None,
     max_height: int | None = None,
     maximize_height: bool = False,
+    max_chars: int | tuple[int | None, ...] | None = None,
+    max_rows: int | None = None,
+    width_sample: int | WidthSample | None = None,
+    workers: int | None = None,
+    split_columns: bool = False,
+    repeat_columns: tuple[int, ...] = (),
     line_break_symbol: str = "/",
     cell_break_symbol: str = "…",
     sep: bool | range | tuple = True,
-    end: str | None = "",
     theme: Theme = Themes.ascii_thin,
     ignore_width_errors: bool = False,
     proportion_coefficient: float = 0.5,
-) -> str:
+    width_cache: WidthCache | None = None,
+    sub_table_cache: SubTableCache | None = None,
+    stream: bool = False,
+    stream_sample_size: int = 100,
+) -> Iterator[str]:
     """
+    Lazily yields the lines of the table without line breaks.
+    Rows are formatted only when the next line is requested
 
     :param table: Two-dimensional matrix
     :param h_align: Can be a line or list, should be from utils.ALLOWED_H_ALIGNS
@@ -447,18 +376,149 @@ def stringify_table(
     :param max_width: Table width or width of individual columns
     :param max_height: The maximum number of lines in one line
     :param maximize_height: Make all lines of the same height max_height
+    :param max_chars: Maximum number of characters of a cell value, for all columns
+        or for each column. Longer values are cut before measuring and splitting
+        and end with cell_break_symbol
+    :param max_rows: Show only the first and the last rows. The row with
+        the number of omitted rows is between them. The widths are calculated
+        from the shown rows
+    :param width_sample: Calculate the widths of the columns from a sample of rows
+        (see WidthSample). An int is the number of the first rows
+    :param workers: Number of processes that format the rows in chunks.
+        The rows must be picklable. None formats the rows in the current process
+    :param split_columns: Split the columns that do not fit in max_width (int)
+        into several tables one under another instead of narrowing all columns
+    :param repeat_columns: Indexes of the columns repeated in each table of split_columns
     :param line_break_symbol: "\\" or "↩" or chr(8617) or "\\U000021a9"
     :param cell_break_symbol: "…" or chr(8230) or "\\U00002026"
     :param sep: Settings of dividers. You can specify specific lines with dividers
-    :param end: Configure the last symbol of the table. \\n or nothing
     :param theme: Theme
     :param ignore_width_errors: Fixes errors in max_width if they exist
     :param proportion_coefficient: Reduction coefficient for too large numbers
-    :return: String table
+    :param width_cache: Width cache for this call (see utils.WidthCache)
+    :param sub_table_cache: Cache of rendered subtables for this call (see SubTableCache)
+    :param stream: Do not materialize the table. Column widths are calculated
+        from the first `stream_sample_size` rows (or taken from max_width if it is a tuple)
+        and each row is formatted only when its lines are requested.
+        Longer values outside the sample are wrapped, wider subtables are clipped.
+        All rows must have the same number of columns
+    :param stream_sample_size: Number of rows to look ahead in stream mode
+    :return: Iterator of table lines
     """
-    file = StringIO()
-    print_table(
-        table=table,
+    # One cache for measuring and rendering, shared with nested subtables
+    sub_table_cache = get_sub_table_cache(sub_table_cache)
+
+    if split_columns and isinstance(max_width, int):
+        if stream:
+            raise ValueError("split_columns cannot be used with stream")
+
+        table = list(table)
+        column_count = max(map(len, table), default=0)
+        if not all(0 <= ci < column_count for ci in repeat_columns):
+            raise ValueError(f"repeat_columns={repeat_columns}")
+
+        # The natural widths of the shown rows
+        measured_table: Sequence[Sequence[Any]] = table
+        if max_rows is not None:
+            head_size = (max_rows + 1) // 2
+            head, tail, _ = get_head_and_tail(table, head_size, max_rows - head_size)
+            measured_table = head + tail
+        if width_sample is not None:
+            if not isinstance(width_sample, WidthSample):
+                width_sample = WidthSample(width_sample)
+            measured_table = width_sample.select(measured_table)
+        with use_width_cache(width_cache), use_sub_table_cache(sub_table_cache):
+            widths = get_column_stats(
+                measured_table,
+                splitters=transform_value(text_splitter, column_count),
+                column_names=fit_column_names(column_names, column_count),
+                column_names_splitters=transform_value(
+                    column_names_splitter, column_count
+                ),
+                max_chars=transform_value(max_chars, column_count),
+            ).widths
+
+        panels = get_column_panels(widths, max_width, repeat_columns)
+        if len(panels) > 1:
+            column_names_list: list[Any] = fit_column_names(column_names, column_count)
+            for pi, columns in enumerate(panels):
+                if pi:
+                    yield ""
+                yield from iter_table_lines(
+                    [[row[ci] for ci in columns] for row in table],
+                    h_align=select_columns(h_align, columns, column_count, "*"),
+                    v_align=select_columns(v_align, columns, column_count, "^"),
+                    text_splitter=select_columns(text_splitter, columns, column_count),
+                    name=name,
+                    name_h_align=name_h_align,
+                    name_v_align=name_v_align,
+                    name_splitter=name_splitter,
+                    column_names=(
+                        [column_names_list[ci] for ci in columns]
+                        if column_names_list
+                        else None
+                    ),
+                    column_names_h_align=select_columns(
+                        column_names_h_align, columns, column_count, "*"
+                    ),
+                    column_names_v_align=select_columns(
+                        column_names_v_align, columns, column_count, "^"
+                    ),
+                    column_names_splitter=select_columns(
+                        column_names_splitter, columns, column_count
+                    ),
+                    max_width=max_width,
+                    max_height=max_height,
+                    maximize_height=maximize_height,
+                    max_chars=select_columns(max_chars, columns, column_count),
+                    max_rows=max_rows,
+                    width_sample=width_sample,
+                    workers=workers,
+                    line_break_symbol=line_break_symbol,
+                    cell_break_symbol=cell_break_symbol,
+                    sep=sep,
+                    theme=theme,
+                    ignore_width_errors=ignore_width_errors,
+                    proportion_coefficient=proportion_coefficient,
+                    width_cache=width_cache,
+                    sub_table_cache=sub_table_cache,
+                )
+            return
+
+    omitted_rows: tuple[int, int] | None = None
+    if max_rows is not None:
+        if max_rows < 1:
+            raise ValueError(f"max_rows={max_rows}")
+
+        head_size = (max_rows + 1) // 2
+        head, tail, omitted_count = get_head_and_tail(
+            table, head_size, max_rows - head_size
+        )
+        list_table: list[list[str | Table | Any]] = head + tail
+        if omitted_count:
+            omitted_rows = (len(head), omitted_count)
+    elif stream:
+        if stream_sample_size < 1:
+            raise ValueError(f"stream_sample_size={stream_sample_size}")
+
+        table_iterator = iter(table)
+        # With explicit widths of columns, one row is enough to count the columns
+        sample_size = 1 if isinstance(max_width, tuple) else stream_sample_size
+        list_table = list(list(row) for row in islice(table_iterator, sample_size))
+    else:
+        list_table = list(list(row) for row in table)
+
+    sample_table = list_table
+    if width_sample is not None:
+        if stream:
+            raise ValueError("width_sample cannot be used with stream")
+
+        if not isinstance(width_sample, WidthSample):
+            width_sample = WidthSample(width_sample)
+        sample_table = width_sample.select(list_table)
+
+    layout = TableLayout.from_table(
+        sample_table,
         h_align=h_align,
         v_align=v_align,
         text_splitter=text_splitter,
@@ -473,31 +533,188 @@ def stringify_table(
         max_width=max_width,
         max_height=max_height,
         maximize_height=maximize_height,
+        max_chars=max_chars,
         line_break_symbol=line_break_symbol,
         cell_break_symbol=cell_break_symbol,
         sep=sep,
-        end=end,
-        file=file,
         theme=theme,
         ignore_width_errors=ignore_width_errors,
         proportion_coefficient=proportion_coefficient,
+        width_cache=width_cache,
+        sub_table_cache=sub_table_cache,
     )
-    file.seek(0)
-    return file.read()
 
+    table_rows: Iterable[list[str | Table | Any]] = list_table
+    if stream and max_rows is None:
+        table_rows = check_column_count(
+            chain(list_table, table_iterator), layout.column_count
+        )
+    elif len(sample_table) < len(list_table):
+        # Rows outside the sample can have more columns
+        column_count = layout.column_count
+        table_rows = (row[:column_count] for row in list_table)
+    yield from layout.iter_lines(table_rows, omitted_rows=omitted_rows, workers=workers)
 
-class Table:
-    def __init__(
-        self,
-        table: Sequence[Sequence[Any]],
-        name: str | None = None,
-        column_names: Sequence[str] | None = None,
-        **kwargs: Any,
-    ):
-        """
-        :param table: Two-dimensional matrix
-        :param name: Table name
-        :param column_names: Column names
+
+def stringify_table(
+    table: Sequence[Sequence[Any]],
+    *,
+    h_align: (
+        tuple[HorizontalAlignment | str, ...] | HorizontalAlignment | str
+    ) = HorizontalAlignment.AUTO,
+    v_align: (
+        tuple[VerticalAlignment | str, ...] | VerticalAlignment | str
+    ) = VerticalAlignment.TOP,
+    text_splitter: BaseTextSplitter | tuple[BaseTextSplitter, ...] = BaseTextSplitter(),
+    name: str | None = None,
+    name_h_align: HorizontalAlignment | str = HorizontalAlignment.CENTER,
+    name_v_align: VerticalAlignment | str = VerticalAlignment.MIDDLE,
+    name_splitter: BaseTextSplitter = BaseTextSplitter(),
+    column_names: Sequence[str] | None = None,
+    column_names_h_align: (
+        tuple[HorizontalAlignment | str, ...] | HorizontalAlignment | str
+    ) = HorizontalAlignment.CENTER,
+    column_names_v_align: (
+        tuple[VerticalAlignment | str, ...] | VerticalAlignment | str
+    ) = VerticalAlignment.MIDDLE,
+    column_names_splitter: (
+        BaseTextSplitter | tuple[BaseTextSplitter, ...]
+    ) = BaseTextSplitter(),
+    max_width: int | tuple[int, ...] | None = None,
+    max_height: int | None = None,
+    maximize_height: bool = False,
+    max_chars: int | tuple[int | None, ...] | None = None,
+    max_rows: int | None = None,
+    width_sample: int | WidthSample | None = None,
+    workers: int | None = None,
+    split_columns: bool = False,
+    repeat_columns: tuple[int, ...] = (),
+    line_break_symbol: str = "/",
+    cell_break_symbol: str = "…",
+    sep: bool | range | tuple = True,
+    end: str | None = "",
+    theme: Theme = Themes.ascii_thin,
+    ignore_width_errors: bool = False,
+    proportion_coefficient: float = 0.5,
+    width_cache: WidthCache | None = None,
+    sub_table_cache: SubTableCache | None = None,
+) -> str:
+    """
+
+    :param table: Two-dimensional matrix
+    :param h_align: Can be a line or list, should be from utils.ALLOWED_H_ALIGNS
+    :param v_align: Can be a line or list, should be from utils.ALLOWED_V_ALIGNS
+    :param text_splitter: An object or class that implements the split_text method
+        to correctly split and process formatted text (such as ANSI sequences)
+    :param name: Table name
+    :param name_h_align: Can be a line or list, should be from utils.ALLOWED_H_ALIGNS
+    :param name_v_align: Can be a line or list, should be from utils.ALLOWED_V_ALIGNS
+    :param name_splitter: An object or class that implements the split_text method
+        to correctly split and process formatted name (such as ANSI sequences)
+    :param column_names: Column names
+    :param column_names_h_align: Horizontal aligns for column names
+    :param column_names_v_align: Vertical aligns for column names
+    :param column_names_splitter: An object or class that implements the split_text method
+        to correctly split and process formatted column names (such as ANSI sequences)
+    :param max_width: Table width or width of individual columns
+    :param max_height: The maximum number of lines in one line
+    :param maximize_height: Make all lines of the same height max_height
+    :param max_chars: Maximum number of characters of a cell value, for all columns
+        or for each column. Longer values are cut before measuring and splitting
+        and end with cell_break_symbol
+    :param max_rows: Show only the first and the last rows. The row with
+        the number of omitted rows is between them. The widths are calculated
+        from the shown rows
+    :param width_sample: Calculate the widths of the columns from a sample of rows
+        (see WidthSample). An int is the number of the first rows
+    :param workers: Number of processes that format the rows in chunks.
+        The rows must be picklable. None formats the rows in the current process
+    :param split_columns: Split the columns that do not fit in max_width (int)
+        into several tables one under another instead of narrowing all columns
+    :param repeat_columns: Indexes of the columns repeated in each table of split_columns
+    :param line_break_symbol: "\\" or "↩" or chr(8617) or "\\U000021a9"
+    :param cell_break_symbol: "…" or chr(8230) or "\\U00002026"
+    :param sep: Settings of dividers. You can specify specific lines with dividers
+    :param end: Configure the last symbol of the table. \\n or nothing
+    :param theme: Theme
+    :param ignore_width_errors: Fixes errors in max_width if they exist
+    :param proportion_coefficient: Reduction coefficient for too large numbers
+    :param width_cache: Width cache for this call (see utils.WidthCache)
+    :param sub_table_cache: Cache of rendered subtables for this call (see SubTableCache)
+    :return: String table
+    """
+    lines = iter_table_lines(
+        table=table,
+        h_align=h_align,
+        v_align=v_align,
+        text_splitter=text_splitter,
+        name=name,
+        name_h_align=name_h_align,
+        name_v_align=name_v_align,
+        name_splitter=name_splitter,
+        column_names=column_names,
+        column_names_h_align=column_names_h_align,
+        column_names_v_align=column_names_v_align,
+        column_names_splitter=column_names_splitter,
+        max_width=max_width,
+        max_height=max_height,
+        maximize_height=maximize_height,
+        max_chars=max_chars,
+        max_rows=max_rows,
+        width_sample=width_sample,
+        workers=workers,
+        split_columns=split_columns,
+        repeat_columns=repeat_columns,
+        line_break_symbol=line_break_symbol,
+        cell_break_symbol=cell_break_symbol,
+        sep=sep,
+        theme=theme,
+        ignore_width_errors=ignore_width_errors,
+        proportion_coefficient=proportion_coefficient,
+        width_cache=width_cache,
+        sub_table_cache=sub_table_cache,
+    )
+    return "\n".join(lines) + ("\n" if end is None else end)
+
+
+def render_many(
+    tables: Iterable["Table | Sequence[Sequence[Any]]"],
+    workers: int | None = None,
+    **kwargs: Any,
+) -> list[str]:
+    """
+    Converts the tables to strings in a thread pool.
+    On free-threaded Python (3.13t) the tables are rendered in parallel
+
+    :param tables: Tables or two-dimensional matrices
+    :param workers: Number of threads. None is the default of ThreadPoolExecutor
+    :param kwargs: Arguments of stringify_table or Table.stringify
+    :return: String tables in the order of `tables`
+    """
+
+    def render(table: "Table | Sequence[Sequence[Any]]") -> str:
+        if isinstance(table, Table):
+            return table.stringify(**kwargs)
+        return stringify_table(table, **kwargs)
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(render, tables))
+
+
+class Table:
+    def __init__(
+        self,
+        table: Sequence[Sequence[Any]],
+        name: str | None = None,
+        column_names: Sequence[str] | None = None,
+        **kwargs: Any,
+    ):
+        """
+        :param table: Two-dimensional matrix
+        :param name: Table name
+        :param column_names: Column names
         :param kwargs: Works only with these keys:
             `h_align`,
             `v_align`,
@@ -510,6 +727,7 @@ class Table:
             `column_names_splitter`,
             `max_height`,
             `maximize_height`,
+            `max_chars`,
             `line_break_symbol`,
             `cell_break_symbol`,
             `proportion_coefficient`,
@@ -555,6 +773,8 @@ class Table:
         reader_kwargs: dict[str, Any] | None = None,
         **kwargs: Any,
     ) -> "Table":
+        import csv
+
         csv_table = list(csv.reader(file, **reader_kwargs or {}))
         table = csv_table[1:]
         column_names_ = csv_table[0] if column_names else None
@@ -587,6 +807,12 @@ class Table:
         max_width: int | tuple[int, ...] | None = None,
         max_height: int | None = None,
         maximize_height: bool = False,
+        max_chars: int | tuple[int | None, ...] | None = None,
+        max_rows: int | None = None,
+        width_sample: int | WidthSample | None = None,
+        workers: int | None = None,
+        split_columns: bool = False,
+        repeat_columns: tuple[int, ...] = (),
         line_break_symbol: str = "/",
         cell_break_symbol: str = "…",
         sep: bool | range | tuple = True,
@@ -594,6 +820,8 @@ class Table:
         theme: Theme = Themes.ascii_thin,
         ignore_width_errors: bool = False,
         proportion_coefficient: float = 0.5,
+        width_cache: WidthCache | None = None,
+        sub_table_cache: SubTableCache | None = None,
     ) -> str:
         """
 
@@ -612,6 +840,19 @@ class Table:
         :param max_width: Table width or width of individual columns
         :param max_height: The maximum number of lines in one line
         :param maximize_height: Make all lines of the same height max_height
+        :param max_chars: Maximum number of characters of a cell value, for all columns
+            or for each column. Longer values are cut before measuring and splitting
+            and end with cell_break_symbol
+        :param max_rows: Show only the first and the last rows. The row with
+            the number of omitted rows is between them. The widths are calculated
+            from the shown rows
+        :param width_sample: Calculate the widths of the columns from a sample of rows
+            (see WidthSample). An int is the number of the first rows
+        :param workers: Number of processes that format the rows in chunks.
+            The rows must be picklable. None formats the rows in the current process
+        :param split_columns: Split the columns that do not fit in max_width (int)
+            into several tables one under another instead of narrowing all columns
+        :param repeat_columns: Indexes of the columns repeated in each table of split_columns
         :param line_break_symbol: "\\" or "↩" or chr(8617) or "\\U000021a9"
         :param cell_break_symbol: "…" or chr(8230) or "\\U00002026"
         :param sep: Settings of dividers. You can specify specific lines with dividers
@@ -619,6 +860,8 @@ class Table:
         :param theme: Theme
         :param ignore_width_errors: Fixes errors in max_width if they exist
         :param proportion_coefficient: Reduction coefficient for too large numbers
+        :param width_cache: Width cache for this call (see utils.WidthCache)
+        :param sub_table_cache: Cache of rendered subtables for this call (see SubTableCache)
         :return: String table
         """
         return stringify_table(
@@ -640,6 +883,12 @@ class Table:
             max_width=max_width,
             max_height=self.config.get("max_height") or max_height,
             maximize_height=self.config.get("maximize_height") or maximize_height,
+            max_chars=self.config.get("max_chars") or max_chars,
+            max_rows=max_rows,
+            width_sample=width_sample,
+            workers=workers,
+            split_columns=split_columns,
+            repeat_columns=repeat_columns,
             line_break_symbol=self.config.get("line_break_symbol") or line_break_symbol,
             cell_break_symbol=self.config.get("cell_break_symbol") or cell_break_symbol,
             sep=sep,
@@ -648,6 +897,8 @@ class Table:
             ignore_width_errors=ignore_width_errors,
             proportion_coefficient=self.config.get("proportion_coefficient")
             or proportion_coefficient,
+            width_cache=width_cache,
+            sub_table_cache=sub_table_cache,
         )
 
     def print(
@@ -677,6 +928,12 @@ class Table:
         max_width: int | tuple[int, ...] | None = None,
         max_height: int | None = None,
         maximize_height: bool = False,
+        max_chars: int | tuple[int | None, ...] | None = None,
+        max_rows: int | None = None,
+        width_sample: int | WidthSample | None = None,
+        workers: int | None = None,
+        split_columns: bool = False,
+        repeat_columns: tuple[int, ...] = (),
         line_break_symbol: str = "/",
         cell_break_symbol: str = "…",
         sep: bool | range | tuple = True,
@@ -685,6 +942,11 @@ class Table:
         theme: Theme = Themes.ascii_thin,
         ignore_width_errors: bool = False,
         proportion_coefficient: float = 0.5,
+        width_cache: WidthCache | None = None,
+        sub_table_cache: SubTableCache | None = None,
+        stream: bool = False,
+        stream_sample_size: int = 100,
+        buffer_size: int = 65536,
     ) -> None:
         """
         Print the table in sys.stdout or file
@@ -704,6 +966,19 @@ class Table:
         :param max_width: Table width or width of individual columns
         :param max_height: The maximum number of lines in one line
         :param maximize_height: Make all lines of the same height max_height
+        :param max_chars: Maximum number of characters of a cell value, for all columns
+            or for each column. Longer values are cut before measuring and splitting
+            and end with cell_break_symbol
+        :param max_rows: Show only the first and the last rows. The row with
+            the number of omitted rows is between them. The widths are calculated
+            from the shown rows
+        :param width_sample: Calculate the widths of the columns from a sample of rows
+            (see WidthSample). An int is the number of the first rows
+        :param workers: Number of processes that format the rows in chunks.
+            The rows must be picklable. None formats the rows in the current process
+        :param split_columns: Split the columns that do not fit in max_width (int)
+            into several tables one under another instead of narrowing all columns
+        :param repeat_columns: Indexes of the columns repeated in each table of split_columns
         :param line_break_symbol: "\\" or "↩" or chr(8617) or "\\U000021a9"
         :param cell_break_symbol: "…" or chr(8230) or "\\U00002026"
         :param sep: Settings of dividers. You can specify specific lines with dividers
@@ -712,6 +987,16 @@ class Table:
         :param theme: Theme
         :param ignore_width_errors: Fixes errors in max_width if they exist
         :param proportion_coefficient: Reduction coefficient for too large numbers
+        :param width_cache: Width cache for this call (see utils.WidthCache)
+        :param sub_table_cache: Cache of rendered subtables for this call (see SubTableCache)
+        :param stream: Do not materialize the table. Column widths are calculated
+            from the first `stream_sample_size` rows (or taken from max_width if it is a tuple)
+            and each row is written to the file as soon as it is formatted.
+            Longer values outside the sample are wrapped, wider subtables are clipped.
+            All rows must have the same number of columns
+        :param stream_sample_size: Number of rows to look ahead in stream mode
+        :param buffer_size: The table is written to the file in blocks
+            of at least this many characters. If 0, each line is written immediately
         :return: None
         """
         print_table(
@@ -733,6 +1018,12 @@ class Table:
             max_width=max_width,
             max_height=self.config.get("max_height") or max_height,
             maximize_height=self.config.get("maximize_height") or maximize_height,
+            max_chars=self.config.get("max_chars") or max_chars,
+            max_rows=max_rows,
+            width_sample=width_sample,
+            workers=workers,
+            split_columns=split_columns,
+            repeat_columns=repeat_columns,
             line_break_symbol=self.config.get("line_break_symbol") or line_break_symbol,
             cell_break_symbol=self.config.get("cell_break_symbol") or cell_break_symbol,
             sep=sep,
@@ -742,6 +1033,140 @@ class Table:
             ignore_width_errors=ignore_width_errors,
             proportion_coefficient=self.config.get("proportion_coefficient")
             or proportion_coefficient,
+            width_cache=width_cache,
+            sub_table_cache=sub_table_cache,
+            stream=stream,
+            stream_sample_size=stream_sample_size,
+            buffer_size=buffer_size,
+        )
+
+    def iter_lines(
+        self,
+        *,
+        h_align: (
+            tuple[HorizontalAlignment | str, ...] | HorizontalAlignment | str
+        ) = HorizontalAlignment.AUTO,
+        v_align: (
+            tuple[VerticalAlignment | str, ...] | VerticalAlignment | str
+        ) = VerticalAlignment.TOP,
+        text_splitter: (
+            BaseTextSplitter | tuple[BaseTextSplitter, ...]
+        ) = AnsiTextSplitter(),
+        name_h_align: HorizontalAlignment | str = HorizontalAlignment.CENTER,
+        name_v_align: VerticalAlignment | str = VerticalAlignment.MIDDLE,
+        name_splitter: BaseTextSplitter = AnsiTextSplitter(),
+        column_names_h_align: (
+            tuple[HorizontalAlignment | str, ...] | HorizontalAlignment | str
+        ) = HorizontalAlignment.CENTER,
+        column_names_v_align: (
+            tuple[VerticalAlignment | str, ...] | VerticalAlignment | str
+        ) = VerticalAlignment.MIDDLE,
+        column_names_splitter: (
+            BaseTextSplitter | tuple[BaseTextSplitter, ...]
+        ) = AnsiTextSplitter(),
+        max_width: int | tuple[int, ...] | None = None,
+        max_height: int | None = None,
+        maximize_height: bool = False,
+        max_chars: int | tuple[int | None, ...] | None = None,
+        max_rows: int | None = None,
+        width_sample: int | WidthSample | None = None,
+        workers: int | None = None,
+        split_columns: bool = False,
+        repeat_columns: tuple[int, ...] = (),
+        line_break_symbol: str = "/",
+        cell_break_symbol: str = "…",
+        sep: bool | range | tuple = True,
+        theme: Theme = Themes.ascii_thin,
+        ignore_width_errors: bool = False,
+        proportion_coefficient: float = 0.5,
+        width_cache: WidthCache | None = None,
+        sub_table_cache: SubTableCache | None = None,
+        stream: bool = False,
+        stream_sample_size: int = 100,
+    ) -> Iterator[str]:
+        """
+        Lazily yields the lines of the table without line breaks
+
+        :param h_align: Can be a line or list, should be from utils.ALLOWED_H_ALIGNS
+        :param v_align: Can be a line or list, should be from utils.ALLOWED_V_ALIGNS
+        :param text_splitter: An object or class that implements the split_text method
+            to correctly split and process formatted text (such as ANSI sequences)
+        :param name_h_align: Can be a line or list, should be from utils.ALLOWED_H_ALIGNS
+        :param name_v_align: Can be a line or list, should be from utils.ALLOWED_V_ALIGNS
+        :param name_splitter: An object or class that implements the split_text method
+            to correctly split and process formatted name (such as ANSI sequences)
+        :param column_names_h_align: Horizontal aligns for column names
+        :param column_names_v_align: Vertical aligns for column names
+        :param column_names_splitter: An object or class that implements the split_text method
+            to correctly split and process formatted column names (such as ANSI sequences)
+        :param max_width: Table width or width of individual columns
+        :param max_height: The maximum number of lines in one line
+        :param maximize_height: Make all lines of the same height max_height
+        :param max_chars: Maximum number of characters of a cell value, for all columns
+            or for each column. Longer values are cut before measuring and splitting
+            and end with cell_break_symbol
+        :param max_rows: Show only the first and the last rows. The row with
+            the number of omitted rows is between them. The widths are calculated
+            from the shown rows
+        :param width_sample: Calculate the widths of the columns from a sample of rows
+            (see WidthSample). An int is the number of the first rows
+        :param workers: Number of processes that format the rows in chunks.
+            The rows must be picklable. None formats the rows in the current process
+        :param split_columns: Split the columns that do not fit in max_width (int)
+            into several tables one under another instead of narrowing all columns
+        :param repeat_columns: Indexes of the columns repeated in each table of split_columns
+        :param line_break_symbol: "\\" or "↩" or chr(8617) or "\\U000021a9"
+        :param cell_break_symbol: "…" or chr(8230) or "\\U00002026"
+        :param sep: Settings of dividers. You can specify specific lines with dividers
+        :param theme: Theme
+        :param ignore_width_errors: Fixes errors in max_width if they exist
+        :param proportion_coefficient: Reduction coefficient for too large numbers
+        :param width_cache: Width cache for this call (see utils.WidthCache)
+        :param sub_table_cache: Cache of rendered subtables for this call (see SubTableCache)
+        :param stream: Do not materialize the table. Column widths are calculated
+            from the first `stream_sample_size` rows (or taken from max_width if it is a tuple)
+            and each row is formatted only when its lines are requested.
+            Longer values outside the sample are wrapped, wider subtables are clipped.
+            All rows must have the same number of columns
+        :param stream_sample_size: Number of rows to look ahead in stream mode
+        :return: Iterator of table lines
+        """
+        return iter_table_lines(
+            table=self.table,
+            h_align=self.config.get("h_align") or h_align,
+            v_align=self.config.get("v_align") or v_align,
+            text_splitter=self.config.get("text_splitter") or text_splitter,
+            name=self.name,
+            name_h_align=self.config.get("name_h_align") or name_h_align,
+            name_v_align=self.config.get("name_v_align") or name_v_align,
+            name_splitter=self.config.get("name_splitter") or name_splitter,
+            column_names=self.column_names,
+            column_names_h_align=self.config.get("column_names_h_align")
+            or column_names_h_align,
+            column_names_v_align=self.config.get("column_names_v_align")
+            or column_names_v_align,
+            column_names_splitter=self.config.get("column_names_splitter")
+            or column_names_splitter,
+            max_width=max_width,
+            max_height=self.config.get("max_height") or max_height,
+            maximize_height=self.config.get("maximize_height") or maximize_height,
+            max_chars=self.config.get("max_chars") or max_chars,
+            max_rows=max_rows,
+            width_sample=width_sample,
+            workers=workers,
+            split_columns=split_columns,
+            repeat_columns=repeat_columns,
+            line_break_symbol=self.config.get("line_break_symbol") or line_break_symbol,
+            cell_break_symbol=self.config.get("cell_break_symbol") or cell_break_symbol,
+            sep=sep,
+            theme=theme,
+            ignore_width_errors=ignore_width_errors,
+            proportion_coefficient=self.config.get("proportion_coefficient")
+            or proportion_coefficient,
+            width_cache=width_cache,
+            sub_table_cache=sub_table_cache,
+            stream=stream,
+            stream_sample_size=stream_sample_size,
         )
 
     def __str__(self):
@@ -758,13 +1183,15 @@ class Table:
         )
 
 
-def get_column_widths(
+def get_column_stats(
     table: Sequence[Sequence],
     splitters: tuple[BaseTextSplitter, ...] | None = None,
-    minimum: bool = False,
-) -> tuple[int, ...]:
+    column_names: Sequence | None = None,
+    column_names_splitters: tuple[BaseTextSplitter, ...] | None = None,
+    max_chars: tuple[int | None, ...] | None = None,
+) -> ColumnStats:
     """
-    Calculates and returns a list of column widths.
+    Calculates the natural and minimum width of each column in one pass over the table.
     If the matrix cell is an instance of Table recursion is used
 
     Not in utils.py due to recursive import
@@ -773,53 +1200,1203 @@ def get_column_widths(
     :param table: Two-dimensional matrix
     :param splitters: An tuple of object or class that implements the clear_formatting method
       to correctly calculate text length (such as HTML tags)
-    :param minimum: Forces the function to return the minimum width for each column, which is 1
+    :param column_names: Column names. Counted as the first row of the table
+    :param column_names_splitters: Same as `splitters`, but for column names
+    :param max_chars: Maximum number of characters of the values of each column.
+      Longer values are cut before measuring
+    :return: ColumnStats(widths, min_widths)
     """
+    rows = [column_names, *table] if column_names else table
+    column_count = min(map(len, rows), default=0)
+    widths = [1] * column_count
+    min_widths = [1] * column_count
+    default_splitter = BaseTextSplitter()
+    cache = call_sub_table_cache.get()
+
+    for ri, row in enumerate(rows):
+        row_splitters = (
+            column_names_splitters if column_names and ri == 0 else splitters
+        )
 
-    def get_subtable_splitter(cell: Table):
-        text_splitter = cell.config.get("text_splitter")
-        if text_splitter is None:
-            return None
-        return transform_value(text_splitter, len(cell.table[0]))
+        for ci in range(column_count):
+            cell = row[ci]
 
-    default_splitter = BaseTextSplitter()
-    row_widths = tuple(
-        max(
-            (
-                (
-                    lambda subtable_row_widths: (
-                        sum(subtable_row_widths) + 3 * len(subtable_row_widths) + 1
-                    )
-                    - 4
-                )(
-                    get_column_widths(
+            if isinstance(cell, Table):
+                sub_table_stats = cache.stats.get(cell) if cache else None
+                if sub_table_stats is None:
+                    text_splitter = cell.config.get("text_splitter")
+                    sub_table_max_chars = cell.config.get("max_chars")
+                    sub_table_stats = get_column_stats(
                         cell.table,
-                        splitters=get_subtable_splitter(cell) or None,
-                        minimum=minimum,
-                    )
-                )
-                if isinstance(cell, Table)
-                else (
-                    1
-                    if minimum
-                    else (
-                        max(
-                            get_text_width_in_console(line)
-                            for line in str(
-                                (
-                                    splitters[ci] if splitters else default_splitter
-                                ).clear_formatting(cell)
-                            ).splitlines()
-                            or [""]
-                        )
-                        or 1
-                        if str(cell)
-                        else 1
+                        splitters=(
+                            None
+                            if text_splitter is None
+                            else transform_value(text_splitter, len(cell.table[0]))
+                        ),
+                        max_chars=(
+                            None
+                            if sub_table_max_chars is None
+                            else transform_value(
+                                sub_table_max_chars, len(cell.table[0])
+                            )
+                        ),
                     )
+                    if cache:
+                        cache.stats[cell] = sub_table_stats
+                        cache.misses += 1
+                elif cache:
+                    cache.hits += 1
+                # The outer borders of the subtable replace the padding of the cell
+                padding = 3 * len(sub_table_stats.widths) + 1 - 4
+                width = sum(sub_table_stats.widths) + padding
+                min_widths[ci] = max(
+                    min_widths[ci], sum(sub_table_stats.min_widths) + padding
                 )
-            )
-            for cell in column
-        )
-        for ci, column in enumerate(zip(*table))
+            else:
+                text = str(cell)
+                if not text:
+                    continue
+                splitter = row_splitters[ci] if row_splitters else default_splitter
+                chars = max_chars[ci] if max_chars else None
+                # clear_formatting gets the cell itself, as before max_chars
+                value = cell
+                if chars is not None and len(text) > chars:
+                    value = splitter.cut_text(text, chars)
+                lines = str(splitter.clear_formatting(value)).splitlines()
+                width = max(map(get_text_width_in_console, lines), default=0) or 1
+
+            if width > widths[ci]:
+                widths[ci] = width
+
+    return ColumnStats(tuple(widths), tuple(min_widths))
+
+
+def get_column_widths(
+    table: Sequence[Sequence],
+    splitters: tuple[BaseTextSplitter, ...] | None = None,
+    minimum: bool = False,
+) -> tuple[int, ...]:
+    """
+    Calculates and returns a list of column widths.
+    If the matrix cell is an instance of Table recursion is used
+
+    :param table: Two-dimensional matrix
+    :param splitters: An tuple of object or class that implements the clear_formatting method
+      to correctly calculate text length (such as HTML tags)
+    :param minimum: Forces the function to return the minimum width for each column, which is 1
+    """
+    stats = get_column_stats(table, splitters=splitters)
+    return stats.min_widths if minimum else stats.widths
+
+
+def check_arguments(
+    column_names: Sequence[str | Table | Any] | None,
+    max_height: int | None,
+    max_chars: int | tuple[int | None, ...] | None,
+    line_break_symbol: str,
+    cell_break_symbol: str,
+    theme: Theme,
+) -> None:
+    """
+    Raises an error if the table arguments are incorrect
+    """
+    if column_names and not column_names[0]:
+        raise ValueError(list(column_names))
+
+    if max_height < 1 if max_height is not None else False:
+        raise ValueError(max_height)
+
+    for chars in max_chars if isinstance(max_chars, tuple) else (max_chars,):
+        if chars is not None and chars < 1:
+            raise ValueError(f"max_chars={max_chars}")
+
+    if len(line_break_symbol) != 1 or not line_break_symbol.isprintable():
+        raise ValueError(f"line_break_symbol={line_break_symbol!r}")
+
+    if len(cell_break_symbol) != 1 or not cell_break_symbol.isprintable():
+        raise ValueError(f"cell_break_symbol={cell_break_symbol!r}")
+
+    if not isinstance(theme, Theme):
+        raise TypeError(theme)
+
+
+def fit_column_names(
+    column_names: Sequence[str | Table | Any] | None, column_count: int
+) -> list[str | Table | Any]:
+    """
+    Brings the column names to the number of columns
+
+    :param column_names: Column names
+    :param column_count: Number of columns
+    :return: List of column names or an empty list
+    """
+    column_names_list: list[str | Table | Any] = (
+        list(column_names) if column_names else []
     )
-    return row_widths
+    if column_names_list:
+        column_names_len = len(column_names_list)
+
+        if column_names_len > column_count:
+            column_names_list = column_names_list[: column_names_len - 1]
+        else:
+            column_names_list.extend((" ",) * (column_count - column_names_len))
+    return column_names_list
+
+
+def check_column_count(
+    rows: Iterable[Sequence[Any]], column_count: int
+) -> Iterator[list[Any]]:
+    """
+    Checks the rows that were not measured, such as the rows of a stream
+
+    :param rows: Rows
+    :param column_count: Number of columns of the layout
+    :return: Iterator of rows as lists
+    """
+    for ri, row in enumerate(rows):
+        row = list(row)
+        if len(row) != column_count:
+            raise ValueError(
+                f"Row {ri} has {len(row)} columns instead of {column_count}"
+            )
+        yield row
+
+
+def get_column_panels(
+    widths: Sequence[int], max_width: int, repeat_columns: tuple[int, ...] = ()
+) -> list[tuple[int, ...]]:
+    """
+    Groups the columns into tables that fit in `max_width` with their natural widths.
+    A column that does not fit even alone gets its own table and is narrowed
+
+    :param widths: Natural widths of the columns
+    :param max_width: Table width
+    :param repeat_columns: Indexes of the columns at the beginning of each table
+    :return: Indexes of the columns of each table
+    """
+    repeated = tuple(dict.fromkeys(repeat_columns))
+    # Each column has 3 characters of borders and padding, and the table has 1 more
+    repeated_width = sum(widths[ci] + 3 for ci in repeated) + 1
+
+    panels: list[tuple[int, ...]] = []
+    columns: list[int] = []
+    width = repeated_width
+    for ci, column_width in enumerate(widths):
+        if ci in repeated:
+            continue
+
+        if columns and width + column_width + 3 > max_width:
+            panels.append((*repeated, *columns))
+            columns = []
+            width = repeated_width
+        columns.append(ci)
+        width += column_width + 3
+
+    if columns or not panels:
+        panels.append((*repeated, *columns))
+    return panels
+
+
+def select_columns(
+    value: Any, columns: tuple[int, ...], column_count: int, default: str | None = None
+) -> Any:
+    """
+    :param value: Argument for all columns or a tuple for each column
+    :param columns: Indexes of the selected columns
+    :param column_count: Number of columns
+    :param default: Default align if `value` is a tuple of aligns
+    :return: Argument for the selected columns
+    """
+    if not isinstance(value, tuple):
+        return value
+
+    if default is None:
+        values = transform_value(value, column_count)
+    else:
+        values = transform_align(column_count, value, default)
+    return tuple(values[ci] for ci in columns)
+
+
+def get_head_and_tail(
+    table: Sequence[Sequence[Any]] | Iterable[Sequence[Any]],
+    head_size: int,
+    tail_size: int,
+) -> tuple[list[list[Any]], list[list[Any]], int]:
+    """
+    Takes the first and the last rows of the table.
+    Sequences are indexed, other iterables are read once
+    and only the last `tail_size` rows are kept
+
+    :param table: Two-dimensional matrix
+    :param head_size: Number of the first rows
+    :param tail_size: Number of the last rows
+    :return: head, tail, number of rows between them
+    """
+    if isinstance(table, Sequence):
+        omitted_count = max(0, len(table) - head_size - tail_size)
+        head_rows: Iterable[Sequence[Any]] = (
+            table[i] for i in range(min(head_size, len(table)))
+        )
+        tail_rows: Iterable[Sequence[Any]] = (
+            table[i] for i in range(head_size + omitted_count, len(table))
+        )
+    else:
+        table_iterator = iter(table)
+        head_rows = list(islice(table_iterator, head_size))
+        # The last row is kept to know the number of rows
+        last_rows = deque(enumerate(table_iterator, 1), maxlen=max(tail_size, 1))
+        skip = len(last_rows) - tail_size
+        tail_rows = [row for _, row in last_rows][skip:]
+        omitted_count = last_rows[-1][0] - len(tail_rows) if last_rows else 0
+
+    return (
+        [list(row) for row in head_rows],
+        [list(row) for row in tail_rows],
+        omitted_count,
+    )
+
+
+class TableLayout:
+    """
+    Render plan for tables with the same schema.
+    Aligns, splitters, borders, the name and the column names are
+    prepared once, and render only formats the rows
+    """
+
+    def __init__(
+        self,
+        widths: Sequence[int],
+        *,
+        h_align: (
+            tuple[HorizontalAlignment | str, ...] | HorizontalAlignment | str
+        ) = HorizontalAlignment.AUTO,
+        v_align: (
+            tuple[VerticalAlignment | str, ...] | VerticalAlignment | str
+        ) = VerticalAlignment.TOP,
+        text_splitter: (
+            BaseTextSplitter | tuple[BaseTextSplitter, ...]
+        ) = AnsiTextSplitter(),
+        name: str | None = None,
+        name_h_align: HorizontalAlignment | str = HorizontalAlignment.CENTER,
+        name_v_align: VerticalAlignment | str = VerticalAlignment.MIDDLE,
+        name_splitter: BaseTextSplitter = AnsiTextSplitter(),
+        column_names: Sequence[str] | None = None,
+        column_names_h_align: (
+            tuple[HorizontalAlignment | str, ...] | HorizontalAlignment | str
+        ) = HorizontalAlignment.CENTER,
+        column_names_v_align: (
+            tuple[VerticalAlignment | str, ...] | VerticalAlignment | str
+        ) = VerticalAlignment.MIDDLE,
+        column_names_splitter: (
+            BaseTextSplitter | tuple[BaseTextSplitter, ...]
+        ) = AnsiTextSplitter(),
+        max_height: int | None = None,
+        maximize_height: bool = False,
+        max_chars: int | tuple[int | None, ...] | None = None,
+        line_break_symbol: str = "/",
+        cell_break_symbol: str = "…",
+        sep: bool | range | tuple = True,
+        theme: Theme = Themes.ascii_thin,
+        proportion_coefficient: float = 0.5,
+        width_cache: WidthCache | None = None,
+        sub_table_cache: SubTableCache | None = None,
+    ):
+        """
+        :param widths: Widths of the column contents
+        :param h_align: Can be a line or list, should be from utils.ALLOWED_H_ALIGNS
+        :param v_align: Can be a line or list, should be from utils.ALLOWED_V_ALIGNS
+        :param text_splitter: An object or class that implements the split_text method
+            to correctly split and process formatted text (such as ANSI sequences)
+        :param name: Table name
+        :param name_h_align: Can be a line or list, should be from utils.ALLOWED_H_ALIGNS
+        :param name_v_align: Can be a line or list, should be from utils.ALLOWED_V_ALIGNS
+        :param name_splitter: An object or class that implements the split_text method
+            to correctly split and process formatted name (such as ANSI sequences)
+        :param column_names: Column names
+        :param column_names_h_align: Horizontal aligns for column names
+        :param column_names_v_align: Vertical aligns for column names
+        :param column_names_splitter: An object or class that implements the split_text method
+            to correctly split and process formatted column names (such as ANSI sequences)
+        :param max_height: The maximum number of lines in one line
+        :param maximize_height: Make all lines of the same height max_height
+        :param max_chars: Maximum number of characters of a cell value, for all columns
+            or for each column. Longer values are cut before measuring and splitting
+            and end with cell_break_symbol
+        :param line_break_symbol: "\\" or "↩" or chr(8617) or "\\U000021a9"
+        :param cell_break_symbol: "…" or chr(8230) or "\\U00002026"
+        :param sep: Settings of dividers. You can specify specific lines with dividers
+        :param theme: Theme
+        :param proportion_coefficient: Reduction coefficient for too large numbers
+        :param width_cache: Width cache for this layout (see utils.WidthCache)
+        :param sub_table_cache: Cache of rendered subtables for this layout (see SubTableCache)
+        """
+        check_arguments(
+            column_names=column_names,
+            max_height=max_height,
+            max_chars=max_chars,
+            line_break_symbol=line_break_symbol,
+            cell_break_symbol=cell_break_symbol,
+            theme=theme,
+        )
+        if not widths:
+            raise ValueError(f"widths={widths}")
+
+        column_count = len(widths)
+        self.widths = tuple(widths)
+        self.column_count = column_count
+        self.name = name
+        self.column_names = fit_column_names(column_names, column_count)
+        self.max_height = max_height
+        self.maximize_height = maximize_height
+        self.max_chars = transform_value(max_chars, column_count)
+        self.line_break_symbol = line_break_symbol
+        self.cell_break_symbol = cell_break_symbol
+        self.sep = sep
+        self.theme = theme
+        self.proportion_coefficient = proportion_coefficient
+        self.width_cache = width_cache
+        self.sub_table_cache = sub_table_cache
+
+        self.text_splitters = transform_value(text_splitter, column_count)
+        self.column_names_splitters = transform_value(
+            column_names_splitter, column_count
+        )
+
+        # Subtables get the aligns as they were passed
+        self.name_h_align = name_h_align
+        self.name_v_align = name_v_align
+        self.column_names_h_align = column_names_h_align
+        self.column_names_v_align = column_names_v_align
+        # Arguments of all subtables in the cache key
+        self.sub_table_key = (
+            *(
+                tuple(align) if isinstance(align, list) else align
+                for align in (
+                    name_h_align,
+                    name_v_align,
+                    column_names_h_align,
+                    column_names_v_align,
+                )
+            ),
+            max_height,
+            line_break_symbol,
+            cell_break_symbol,
+            theme,
+            proportion_coefficient,
+        )
+
+        self.h_aligns = transform_align(column_count, h_align)
+        self.v_aligns = transform_align(column_count, v_align, default="^")
+        self.column_names_h_aligns = transform_align(column_count, column_names_h_align)
+        self.column_names_v_aligns = transform_align(
+            column_count, column_names_v_align, default="^"
+        )
+
+        (
+            self.up_separator,
+            self.under_name_separator,
+            self.up_noname_separator,
+            self.line_separator,
+            self.line_separator_plus,
+            self.down_separator,
+        ) = generate_borders(theme, self.widths)
+        # Borders above and below the row with the number of omitted rows
+        border = theme.border
+        self.over_omitted_separator = (
+            border.vertical_left + self.down_separator[1:-1] + border.vertical_right
+        )
+        self.down_omitted_separator = (
+            border.bottom_left + self.up_separator[1:-1] + border.bottom_right
+        )
+
+        self.name_lines: list[str] = []
+        if name:
+            with use_width_cache(width_cache):
+                self.name_lines = self.render_name(name, name_splitter)
+
+    @classmethod
+    def from_table(
+        cls,
+        table: Sequence[Sequence[Any]],
+        *,
+        text_splitter: (
+            BaseTextSplitter | tuple[BaseTextSplitter, ...]
+        ) = AnsiTextSplitter(),
+        column_names: Sequence[str] | None = None,
+        column_names_splitter: (
+            BaseTextSplitter | tuple[BaseTextSplitter, ...]
+        ) = AnsiTextSplitter(),
+        max_width: int | tuple[int, ...] | None = None,
+        max_height: int | None = None,
+        max_chars: int | tuple[int | None, ...] | None = None,
+        line_break_symbol: str = "/",
+        cell_break_symbol: str = "…",
+        theme: Theme = Themes.ascii_thin,
+        ignore_width_errors: bool = False,
+        proportion_coefficient: float = 0.5,
+        width_cache: WidthCache | None = None,
+        sub_table_cache: SubTableCache | None = None,
+        **kwargs: Any,
+    ) -> "TableLayout":
+        """
+        Calculates the widths of the columns in the same way as print_table
+
+        :param table: Two-dimensional matrix
+        :param text_splitter: An object or class that implements the split_text method
+            to correctly split and process formatted text (such as ANSI sequences)
+        :param column_names: Column names
+        :param column_names_splitter: An object or class that implements the split_text method
+            to correctly split and process formatted column names (such as ANSI sequences)
+        :param max_width: Table width or width of individual columns
+        :param max_height: The maximum number of lines in one line
+        :param max_chars: Maximum number of characters of a cell value, for all columns
+            or for each column. Longer values are cut before measuring and splitting
+            and end with cell_break_symbol
+        :param line_break_symbol: "\\" or "↩" or chr(8617) or "\\U000021a9"
+        :param cell_break_symbol: "…" or chr(8230) or "\\U00002026"
+        :param theme: Theme
+        :param ignore_width_errors: Fixes errors in max_width if they exist
+        :param proportion_coefficient: Reduction coefficient for too large numbers
+        :param width_cache: Width cache for this layout (see utils.WidthCache)
+        :param sub_table_cache: Cache of rendered subtables for this layout (see SubTableCache)
+        :param kwargs: Other arguments of TableLayout
+        :return: TableLayout
+        """
+        # Raise errors
+        if not any(table) or not sum(hasattr(row, "__getitem__") for row in table):
+            raise ValueError(table)
+
+        column_count = max(map(len, table))
+
+        with use_width_cache(width_cache), use_sub_table_cache(
+            get_sub_table_cache(sub_table_cache)
+        ):
+            # Natural and minimum widths of all columns in one pass over the table
+            row_widths, min_row_widths = get_column_stats(
+                table,
+                splitters=transform_value(text_splitter, column_count),
+                column_names=fit_column_names(column_names, column_count),
+                column_names_splitters=transform_value(
+                    column_names_splitter, column_count
+                ),
+                max_chars=transform_value(max_chars, column_count),
+            )
+
+        if max_width is not None:
+            min_width = sum(min_row_widths) + 3 * column_count + 1
+            if isinstance(max_width, int):
+                if max_width < min_width:
+                    if ignore_width_errors:
+                        max_width = min_width
+                    else:
+                        raise ValueError(f"{max_width} >= {min_width}")
+            else:
+                invalid_widths = [mw for mw in max_width if mw < 1]
+                if invalid_widths:
+                    if ignore_width_errors:
+                        max_width = tuple(1 if mw < 1 else mw for mw in max_width)
+                    else:
+                        raise ValueError(
+                            f"Values in {invalid_widths} from max_width are less than one"
+                        )
+                max_width = max_width[:column_count]
+                max_width = (
+                    *max_width,
+                    *(max_width[-1],) * (column_count - len(max_width)),
+                )
+                sum_max_width = sum(max_width) + 3 * column_count + 1
+                if sum_max_width < min_width:
+                    if ignore_width_errors:
+                        max_width = proportional_change(
+                            row_widths,
+                            sum(max_width) + (min_width - sum_max_width),
+                            min_row_widths,
+                        )
+                    else:
+                        raise ValueError(
+                            f"{sum_max_width} >= {min_width}: "
+                            f"Increase the sum of max_width by {min_width - sum_max_width}"
+                        )
+
+                incorrect_max_widths = tuple(
+                    max_w
+                    for max_w, min_w in zip(max_width, min_row_widths)
+                    if max_w < min_w
+                )
+                if incorrect_max_widths:
+                    if ignore_width_errors:
+                        max_width = tuple(
+                            max(max_w, min_w)
+                            for max_w, min_w in zip(max_width, min_row_widths)
+                        )
+                    else:
+                        raise ValueError(
+                            f"Values in {max_width} must be greater than or equal "
+                            f"to the corresponding values from {min_row_widths}. "
+                            f"Incorrect values: {incorrect_max_widths}"
+                        )
+
+        max_widths = transform_width(
+            max_width, column_count, row_widths, min_row_widths, proportion_coefficient
+        )
+        return cls(
+            max_widths,
+            text_splitter=text_splitter,
+            column_names=column_names,
+            column_names_splitter=column_names_splitter,
+            max_height=max_height,
+            max_chars=max_chars,
+            line_break_symbol=line_break_symbol,
+            cell_break_symbol=cell_break_symbol,
+            theme=theme,
+            proportion_coefficient=proportion_coefficient,
+            width_cache=width_cache,
+            sub_table_cache=sub_table_cache,
+            **kwargs,
+        )
+
+    def __getstate__(self) -> dict[str, Any]:
+        # The caches are not sent to the worker processes of iter_lines
+        state = self.__dict__.copy()
+        state["width_cache"] = None
+        state["sub_table_cache"] = None
+        return state
+
+    def render_name(self, name: str, name_splitter: BaseTextSplitter) -> list[str]:
+        lines: list[str] = []
+        if self.up_separator.strip():
+            lines.append(self.up_separator)
+
+        lines.extend(
+            self.render_full_width_cell(
+                name, name_splitter, self.name_h_align, self.name_v_align
+            )
+        )
+        return lines
+
+    def render_omitted_rows(self, count: int) -> list[str]:
+        """
+        :param count: Number of omitted rows
+        :return: Lines of the row with the number of omitted rows without separators
+        """
+        symbol = self.cell_break_symbol
+        max_text_width = sum(self.widths) + (3 * self.column_count) + 1 - 4
+        # The longest text that fits in one line, otherwise the shortest one
+        for text in (
+            f"{symbol} {count} row{'s' * (count != 1)} omitted {symbol}",
+            f"{symbol} {count} omitted {symbol}",
+            f"{symbol} {count} {symbol}",
+        ):
+            if len(text) <= max_text_width:
+                break
+        return self.render_full_width_cell(
+            text, BaseTextSplitter(), HorizontalAlignment.CENTER, VerticalAlignment.TOP
+        )
+
+    def render_full_width_cell(
+        self,
+        text: str,
+        splitter: BaseTextSplitter,
+        h_align: HorizontalAlignment | str,
+        v_align: VerticalAlignment | str,
+    ) -> list[str]:
+        """
+        :param text: Text of the cell across all columns
+        :param splitter: An object or class that implements the split_text method
+        :param h_align: Horizontal align of the text
+        :param v_align: Vertical align of the text
+        :return: Lines of the cell
+        """
+        max_name_width = sum(self.widths) + (3 * self.column_count) + 1 - 4
+
+        rows, symbols, subtable_columns, border_data_list = cast(
+            tuple[
+                tuple[list[str], ...],
+                tuple[list[str], ...],
+                tuple[bool, ...],
+                tuple[dict[str, tuple[str, ...]], ...],
+            ],
+            zip(
+                splitter.split_text(
+                    text=text,
+                    width=max_name_width,
+                    height=self.max_height,
+                    line_break_symbol=self.line_break_symbol,
+                    cell_break_symbol=self.cell_break_symbol,
+                )
+            ),
+        )
+        return fill_line(
+            columns_lines=rows,
+            columns_symbols=symbols,
+            subtable_columns=subtable_columns,
+            border_data_list=border_data_list,
+            widths=(max_name_width,),
+            h_align=transform_align(1, h_align),
+            v_align=transform_align(1, v_align, default="^"),
+            theme=self.theme,
+        ).split("\n")
+
+    def render_sub_table(
+        self, sub_table: "Table", width: int, h_align: str, v_align: str
+    ) -> tuple[list[str], list[str], bool, dict[str, tuple[str, ...]]]:
+        """
+        :param sub_table: Table in the cell
+        :param width: Width of the cell
+        :param h_align: Horizontal align of the column
+        :param v_align: Vertical align of the column
+        :return: lines, symbols, is_subtable, borders
+        """
+        kwargs: dict[str, Any] = {
+            "h_align": h_align,
+            "v_align": v_align,
+            "name_h_align": self.name_h_align,
+            "name_v_align": self.name_v_align,
+            "column_names_h_align": self.column_names_h_align,
+            "column_names_v_align": self.column_names_v_align,
+            "line_break_symbol": self.line_break_symbol,
+            "cell_break_symbol": self.cell_break_symbol,
+            "theme": self.theme.custom_sub_table_theme,
+            "ignore_width_errors": True,
+            "proportion_coefficient": self.proportion_coefficient,
+        }
+        string_sub_table = sub_table.stringify(max_width=width + 4, **kwargs)
+        # A row that was not measured (fixed widths, stream or width_sample)
+        # can hold a subtable wider than the column.
+        # It is rendered with its natural widths and shown as clipped text
+        if get_text_width_in_console(string_sub_table.split("\n", 1)[0]) > width + 4:
+            return self.clip_sub_table(sub_table.stringify(**kwargs), width)
+        return split_text_for_sub_table(string_sub_table, self.max_height)
+
+    def clip_sub_table(
+        self, string_sub_table: str, width: int
+    ) -> tuple[list[str], list[str], bool, dict[str, tuple[str, ...]]]:
+        """
+        :param string_sub_table: Subtable that is wider than the cell
+        :param width: Width of the cell
+        :return: lines, symbols, is_subtable, borders of the clipped text
+        """
+        sub_table_lines = string_sub_table.splitlines()
+        if self.max_height and len(sub_table_lines) > self.max_height:
+            sub_table_lines = sub_table_lines[: self.max_height]
+            symbols = [" "] * (self.max_height - 1) + [self.cell_break_symbol]
+        else:
+            symbols = [" "] * len(sub_table_lines)
+
+        # The subtable keeps the escape sequences of its cells
+        splitter = AnsiTextSplitter()
+        lines = []
+        for li, line in enumerate(sub_table_lines):
+            parts, _, _, _ = splitter.split_text(line, width)
+            lines.append(parts[0])
+            if len(parts) > 1:
+                symbols[li] = self.cell_break_symbol
+        return lines, symbols, False, {}
+
+    def render(self, rows: Iterable[Sequence[Any]]) -> str:
+        """
+        :param rows: Rows with the number of columns of the layout
+        :return: String table
+        """
+        return "\n".join(self.iter_lines(rows))
+
+    def split_row(
+        self, row: Sequence[Any], column_names: bool = False
+    ) -> tuple[
+        list[tuple[list[str], list[str], bool, dict[str, tuple[str, ...]]]],
+        tuple[bool, ...],
+    ]:
+        """
+        Splits the cells of the row by the widths of the columns.
+        Uses the width and subtable caches of the current call
+
+        :param row: Row with the number of columns of the layout
+        :param column_names: The row is the column names
+        :return: Split cells (lines, symbols, is_subtable, borders)
+            and flags of numbers that need no parsing
+        """
+        max_widths = self.widths
+        max_height = self.max_height
+        h_align_t, v_align_t = self.h_aligns, self.v_aligns
+        sub_table_cache = get_sub_table_cache()
+
+        splitted_row: list[
+            tuple[list[str], list[str], bool, dict[str, tuple[str, ...]]]
+        ] = []
+        numbers: list[bool] = []
+
+        for ci, column in enumerate(row):
+            number = False
+            if isinstance(column, Table):
+                key = (
+                    column,
+                    max_widths[ci],
+                    h_align_t[ci],
+                    v_align_t[ci],
+                    self.sub_table_key,
+                )
+                sub_table = sub_table_cache.lines.get(key)
+                if sub_table is None:
+                    sub_table = self.render_sub_table(
+                        column, max_widths[ci], h_align_t[ci], v_align_t[ci]
+                    )
+                    sub_table_cache.lines[key] = sub_table
+                    sub_table_cache.misses += 1
+                else:
+                    sub_table_cache.hits += 1
+                # The lines are extended to the height of the row
+                column_lines = (
+                    sub_table[0].copy(),
+                    sub_table[1].copy(),
+                    sub_table[2],
+                    sub_table[3],
+                )
+            else:
+                splitter = (
+                    self.column_names_splitters if column_names else self.text_splitters
+                )
+                text = str(column)
+                chars = self.max_chars[ci]
+                cut = False
+                if chars is not None and len(text) > chars:
+                    text = splitter[ci].cut_text(text, chars)
+                    cut = True
+                column_lines = splitter[ci].split_text(
+                    text=text,
+                    width=max_widths[ci],
+                    height=max_height,
+                    line_break_symbol=self.line_break_symbol,
+                    cell_break_symbol=self.cell_break_symbol,
+                )
+                if cut:
+                    column_lines[1][-1] = self.cell_break_symbol
+                # A number that was not wrapped or cut needs no parsing
+                number = not cut and is_number(column) and column_lines[0] == [text]
+            numbers.append(number)
+            splitted_row.append(column_lines)
+
+        return splitted_row, tuple(numbers)
+
+    def row_height(self, row: Sequence[Any], column_names: bool = False) -> int:
+        """
+        :param row: Row with the number of columns of the layout
+        :param column_names: The row is the column names
+        :return: Number of lines of the row without separators
+        """
+        if self.maximize_height and self.max_height:
+            return self.max_height
+
+        with use_width_cache(self.width_cache), use_sub_table_cache(
+            get_sub_table_cache(self.sub_table_cache)
+        ):
+            splitted_row, _ = self.split_row(row, column_names)
+        return max(len(column[0]) for column in splitted_row)
+
+    def render_row(
+        self, row: Sequence[Any], column_names: bool = False
+    ) -> tuple[list[str], tuple[dict[str, tuple[str, ...]], ...]]:
+        """
+        Formats the row without separators.
+        Uses the width and subtable caches of the current call
+
+        :param row: Row with the number of columns of the layout
+        :param column_names: The row is the column names
+        :return: Lines of the row and the borders of its cells
+        """
+        theme = self.theme
+        max_height = self.max_height
+        splitted_row, numbers = self.split_row(row, column_names)
+
+        if self.maximize_height and max_height:
+            max_row_height = max_height
+        else:
+            max_row_height = max(map(len, tuple(zip(*splitted_row))[0]))
+
+        for column in splitted_row:
+            if column[2]:  # is subtable
+                border_data: dict = column[3]
+                string = (
+                    " "
+                    + "".join(
+                        (
+                            theme.border.vertical
+                            if symbol == theme.border.bottom_horizontal
+                            else " "
+                        )
+                        for symbol in border_data["border_bottom"]
+                    )
+                    + " "
+                )
+                extend_data = (string,) * (max_row_height - len(column[0]))
+            else:
+                extend_data = (" ",) * (max_row_height - len(column[0]))
+            column[0].extend(extend_data)
+            column[1].extend(extend_data)
+
+        rows_: tuple[list[str], ...]
+        symbols: tuple[list[str], ...]
+        subtable_columns: tuple[bool, ...]
+        border_data_list: tuple[dict[str, tuple[str, ...]], ...]
+        rows_, symbols, subtable_columns, border_data_list = zip(*splitted_row)
+
+        line = fill_line(
+            columns_lines=rows_,
+            columns_symbols=symbols,
+            subtable_columns=subtable_columns,
+            border_data_list=border_data_list,
+            widths=self.widths,
+            h_align=self.column_names_h_aligns if column_names else self.h_aligns,
+            v_align=self.column_names_v_aligns if column_names else self.v_aligns,
+            theme=theme,
+            numbers=numbers,
+        )
+        return line.split("\n"), border_data_list
+
+    def render_rows(
+        self, rows: Sequence[Sequence[Any]]
+    ) -> list[tuple[list[str], tuple[dict[str, tuple[str, ...]], ...]]]:
+        """
+        Formats a chunk of rows with the caches of this layout.
+        Called in the worker processes of iter_lines
+
+        :param rows: Rows with the number of columns of the layout
+        :return: Results of render_row
+        """
+        with use_width_cache(self.width_cache), use_sub_table_cache(
+            get_sub_table_cache(self.sub_table_cache)
+        ):
+            return [self.render_row(row) for row in rows]
+
+    def iter_rendered_rows(
+        self,
+        rows: Iterable[Sequence[Any]],
+        workers: int | None = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[tuple[list[str], tuple[dict[str, tuple[str, ...]], ...]]]:
+        """
+        :param rows: Rows with the number of columns of the layout
+        :param workers: Number of processes that format the chunks of rows.
+            None formats the rows in the current process
+        :param chunk_size: Number of rows sent to a process at once
+        :return: Iterator of the results of render_row in the order of the rows
+        """
+        if workers is None:
+            sub_table_cache = get_sub_table_cache(self.sub_table_cache)
+            for row in rows:
+                with use_width_cache(self.width_cache), use_sub_table_cache(
+                    sub_table_cache
+                ):
+                    rendered_row = self.render_row(row)
+                yield rendered_row
+            return
+
+        if workers < 1:
+            raise ValueError(f"workers={workers}")
+
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size={chunk_size}")
+
+        from concurrent.futures import Future, ProcessPoolExecutor
+
+        rows_iterator = iter(rows)
+        chunks = iter(lambda: list(islice(rows_iterator, chunk_size)), [])
+        executor = ProcessPoolExecutor(workers)
+        try:
+            # A few chunks per process are formatted ahead, the rest are not read yet
+            futures: deque[Future] = deque()
+            for chunk in chunks:
+                if len(futures) >= workers * 2:
+                    yield from futures.popleft().result()
+                futures.append(executor.submit(self.render_rows, chunk))
+            while futures:
+                yield from futures.popleft().result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def iter_lines(
+        self,
+        rows: Iterable[Sequence[Any]],
+        start: int = 0,
+        omitted_rows: tuple[int, int] | None = None,
+        workers: int | None = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[str]:
+        """
+        Lazily yields the lines of the table without line breaks
+
+        :param rows: Rows with the number of columns of the layout
+        :param start: Index of the first row in the whole table.
+            The separators between the rows are chosen by their index in the whole table
+        :param omitted_rows: (position, count). A row with the number of omitted rows
+            is inserted before the row with this position in `rows`
+        :param workers: Number of processes that format the chunks of rows.
+            The layout and the rows must be picklable. None formats the rows
+            in the current process
+        :param chunk_size: Number of rows sent to a process at once
+        :return: Iterator of table lines
+        """
+        theme = self.theme
+        sep = self.sep
+        max_widths = self.widths
+        column_names_list = self.column_names
+
+        yield from self.name_lines
+
+        rendered_rows = self.iter_rendered_rows(rows, workers, chunk_size)
+        if column_names_list:
+            with use_width_cache(self.width_cache), use_sub_table_cache(
+                get_sub_table_cache(self.sub_table_cache)
+            ):
+                column_names_row = self.render_row(column_names_list, True)
+            rendered_rows = chain((column_names_row,), rendered_rows)
+
+        previous_border_data: tuple[dict[str, tuple[str, ...]], ...] = ({"": ("",)},)
+
+        omitted_position, omitted_count = omitted_rows or (-1, 0)
+        if omitted_rows and column_names_list:
+            omitted_position += 1
+        after_omitted_rows = False
+        ri = -1
+
+        for ri, (row_lines, border_data_list) in enumerate(rendered_rows):
+            lines: list[str] = []
+
+            if ri == omitted_position:
+                if self.over_omitted_separator.strip():
+                    lines.append(
+                        apply_border_data(
+                            self.over_omitted_separator,
+                            "border_bottom",
+                            theme,
+                            previous_border_data,
+                            max_widths,
+                        )
+                    )
+                lines.extend(self.render_omitted_rows(omitted_count))
+                # The next rows have their indexes in the whole table
+                start += omitted_count
+                after_omitted_rows = True
+
+            if (
+                after_omitted_rows
+                or (sep is True or ri == 0)  # under table name
+                or (column_names_list and ri == 1)  # under column names
+                or (
+                    isinstance(sep, (range, tuple))
+                    and (
+                        start + ri - 1 in sep
+                        if column_names_list
+                        else start + ri in sep
+                    )
+                )  # if sep allows
+            ):
+                if ri == 0:
+                    # separator under table name
+                    s = (
+                        self.under_name_separator
+                        if self.name
+                        else self.up_noname_separator
+                    )
+                elif after_omitted_rows:
+                    # separator under the omitted rows
+                    s = self.under_name_separator
+                elif ri == 1 and (column_names_list or not start):
+                    # separator under column names (if theme supports)
+                    s = self.line_separator_plus
+                else:
+                    # normal separator
+                    s = self.line_separator
+
+                if s.strip():
+                    # connect the borders from above
+                    s = apply_border_data(
+                        s, "border_top", theme, border_data_list, max_widths
+                    )
+                    # if possible, connect the borders from below.
+                    if ri > 0 and not after_omitted_rows:
+                        s = apply_border_data(
+                            s,
+                            "border_bottom",
+                            theme,
+                            previous_border_data,
+                            max_widths,
+                        )
+                    lines.append(s)
+
+            lines.extend(row_lines)
+            previous_border_data = border_data_list
+            after_omitted_rows = False
+
+            yield from lines
+
+        if omitted_position == ri + 1:
+            # The omitted rows are the last
+            if self.over_omitted_separator.strip():
+                yield apply_border_data(
+                    self.over_omitted_separator,
+                    "border_bottom",
+                    theme,
+                    previous_border_data,
+                    max_widths,
+                )
+            yield from self.render_omitted_rows(omitted_count)
+            if self.down_omitted_separator.strip():
+                yield self.down_omitted_separator
+        elif self.down_separator.strip():
+            yield apply_border_data(
+                self.down_separator.rstrip("\n"),
+                "border_bottom",
+                theme,
+                previous_border_data,
+                max_widths,
+            )
+
+
+class TablePaginator:
+    """
+    Renders pages of a table with the widths, borders and separators of the whole table.
+    The widths are calculated once, and each page formats only its rows.
+    A page has `page_size` rows, so any page is found and rendered
+    in time proportional to the page size.
+    With `page_height`, a page has as many rows as fit in `page_height` lines
+    with the name, column names and borders. This needs the height of every row,
+    so the constructor formats the whole table once to index the row heights
+    and the page bounds; after that any page is rendered in time proportional to its size
+
+    EXAMPLE
+
+    paginator = TablePaginator(rows, page_size=20, column_names=("id", "name"))
+    paginator.page_count
+    print(paginator.render_page(3))
+    """
+
+    def __init__(
+        self,
+        table: Sequence[Sequence[Any]],
+        page_size: int = 20,
+        page_height: int | None = None,
+        **kwargs: Any,
+    ):
+        """
+        :param table: Two-dimensional matrix
+        :param page_size: Number of rows on a page
+        :param page_height: Maximum number of lines on a page.
+            A row that does not fit on an empty page gets its own page.
+            Builds the height index of the whole table (see `index_heights`)
+        :param kwargs: Arguments of TableLayout.from_table
+        """
+        if page_size < 1:
+            raise ValueError(f"page_size={page_size}")
+        if page_height is not None and page_height < 1:
+            raise ValueError(f"page_height={page_height}")
+
+        self.table = table
+        self.page_size = page_size
+        self.page_height = page_height
+        # One subtable cache for the layout and all pages
+        kwargs["sub_table_cache"] = get_sub_table_cache(kwargs.get("sub_table_cache"))
+        self.layout = TableLayout.from_table(table, **kwargs)
+        # Number of lines of each row without separators (only with page_height)
+        self.row_heights: list[int] = []
+        # Indexes of the first rows of the pages and the end of the table
+        self.page_bounds: list[int] = [0]
+
+        layout = self.layout
+        top_separator = (
+            layout.under_name_separator if layout.name else layout.up_noname_separator
+        )
+        self.page_overhead = (
+            len(layout.name_lines)
+            + bool(top_separator.strip())
+            + bool(layout.down_separator.strip())
+        )
+        if layout.column_names:
+            self.page_overhead += layout.row_height(
+                layout.column_names, column_names=True
+            ) + bool(layout.line_separator_plus.strip())
+
+        if page_height is not None:
+            self.index_heights()
+
+    @property
+    def page_count(self) -> int:
+        if self.page_height is None:
+            return -(-len(self.table) // self.page_size)
+        return len(self.page_bounds) - 1
+
+    def index_heights(self) -> None:
+        """
+        Formats every row once to index the row heights and the page bounds.
+        Takes time proportional to the whole table
+        """
+        self.row_heights = [self.layout.row_height(row) for row in self.table]
+        self.page_bounds = [0]
+        while self.page_bounds[-1] < len(self.table):
+            self.page_bounds.append(self.find_page_end(self.page_bounds[-1]))
+
+    def get_separator_height(self, index: int) -> int:
+        """
+        :param index: Index of the row that is not the first on its page
+        :return: Number of lines of the separator above the row
+        """
+        layout = self.layout
+        sep = layout.sep
+        if sep is True or (isinstance(sep, (range, tuple)) and index in sep):
+            if index == 1 and not layout.column_names:
+                return bool(layout.line_separator_plus.strip())
+            return bool(layout.line_separator.strip())
+        return 0
+
+    def find_page_end(self, start: int) -> int:
+        """
+        :param start: Index of the first row of the page
+        :return: Index of the first row after the page
+        """
+        assert self.page_height is not None
+        height = self.page_overhead + self.row_heights[start]
+        end = start + 1
+        while end < len(self.table):
+            height += self.get_separator_height(end) + self.row_heights[end]
+            if height > self.page_height:
+                break
+            end += 1
+        return end
+
+    def get_page_rows(self, page: int) -> range:
+        """
+        :param page: Index of the page
+        :return: Indexes of the rows of the page
+        """
+        if page < 0:
+            raise IndexError(page)
+
+        if self.page_height is None:
+            start = page * self.page_size
+            end = min(start + self.page_size, len(self.table))
+        else:
+            if len(self.page_bounds) <= page + 1:
+                raise IndexError(page)
+            start, end = self.page_bounds[page], self.page_bounds[page + 1]
+
+        if start >= len(self.table):
+            raise IndexError(page)
+        return range(start, end)
+
+    def iter_page_lines(self, page: int) -> Iterator[str]:
+        """
+        Lazily yields the lines of the page without line breaks
+
+        :param page: Index of the page
+        :return: Iterator of page lines
+        """
+        rows = self.get_page_rows(page)
+        return self.layout.iter_lines(
+            (self.table[index] for index in rows), start=rows.start
+        )
+
+    def render_page(self, page: int) -> str:
+        """
+        :param page: Index of the page
+        :return: String page
+        """
+        return "\n".join(self.iter_page_lines(page))
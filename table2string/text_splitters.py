@@ -1,9 +1,23 @@
 import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Iterator, cast
 
-from table2string.utils import get_text_width_in_console
+from table2string.utils import (
+    LazyRegex,
+    calculate_text_width,
+    cut_text_by_width,
+    get_text_width_in_console,
+    wrap_line,
+)
 
 
 class BaseTextSplitter:
+    """
+    The splitters are shared between tables and threads through default arguments,
+    so they must not keep any state between calls
+    """
+
     def split_text(
         self,
         text: str,
@@ -23,6 +37,10 @@ class BaseTextSplitter:
         :return: Split text by width and height
         lines, symbols, is_subtable, borders
         """
+        max_plain_width = self.get_max_plain_width(width, height)
+        if max_plain_width is not None and "\x1b" not in text:
+            # The lines after the visible ones are not split
+            text = cut_text_by_width(text, max_plain_width)
         lines = text.splitlines() or [""]
 
         if width is None:
@@ -32,23 +50,27 @@ class BaseTextSplitter:
         result_symbols: list[str] = []
 
         for line in lines:
-            if get_text_width_in_console(line) == 0:
+            # One line more than the height is enough to know that the text is cut
+            if height and len(result_lines) > height:
+                break
+            if height and "\x1b" not in line:
+                # A prefix is enough to know that the line is not empty
+                line_width = calculate_text_width(cut_text_by_width(line, 0))
+            else:
+                line_width = get_text_width_in_console(line)
+            if line_width == 0:
                 result_lines.append("")
                 result_symbols.append(" ")
             else:
-                while line:
-                    if get_text_width_in_console(line) <= width:
-                        result_lines.append(line)
-                        result_symbols.append(" ")
-                        line = ""
-                    else:
-                        w = 0
-                        assert width >= 1, width
-                        while get_text_width_in_console(line[:w]) <= width - 1:
-                            w += 1
-                        result_lines.append(line[:w])
-                        result_symbols.append(line_break_symbol)
-                        line = line[w:]
+                max_parts = height + 1 - len(result_lines) if height else None
+                parts = wrap_line(line, width, max_parts)
+                result_lines.extend(parts)
+                result_symbols.extend(line_break_symbol for _ in parts[1:])
+                # The last part is wider than the width if its last character did not fit
+                if get_text_width_in_console(parts[-1]) <= width:
+                    result_symbols.append(" ")
+                else:
+                    result_symbols.append(line_break_symbol)
 
         if height and len(result_lines) > height:
             result_lines = result_lines[:height]
@@ -59,39 +81,239 @@ class BaseTextSplitter:
         borders: dict[str, tuple[str, ...]] = {}
         return result_lines, result_symbols, is_subtable, borders
 
+    @staticmethod
+    def get_max_plain_width(width: int | None, height: int | None) -> int | None:
+        """
+        Each part of a line is at most width + 1 columns wide,
+        so the text wider than this gives all visible lines
+
+        :param width: Width
+        :param height: Height
+        :return: Width of the text that is enough to split or None if the whole text is needed
+        """
+        return (height + 3) * (width + 1) if width and height else None
+
     def clear_formatting(self, text: str):
         return text
 
+    def cut_text(self, text: str, max_chars: int) -> str:
+        """
+        Cuts too long text before measuring and splitting
+
+        :param text: Text
+        :param max_chars: Maximum number of characters
+        :return: The beginning of the text
+        """
+        return text[:max_chars]
+
 
 class AnsiTextSplitterUnsafe(BaseTextSplitter):
-    COLOR_REGEX = re.compile(r"\x1b\[[0-9;]*m")
-    OSC_LINK_OPEN_REGEX = re.compile(r"\x1b]8;;(?P<url>[^\x1b]+)\x1b\\")
+    COLOR_REGEX = LazyRegex(r"\x1b\[[0-9;]*m")
+    OSC_LINK_OPEN_REGEX = LazyRegex(r"\x1b]8;;(?P<url>[^\x1b]+)\x1b\\")
     OSC_LINK_CLOSE = "\x1b]8;;\x1b\\"
+    # The order of the alternatives is the priority of the tokens
+    ANSI_TOKEN_REGEX = LazyRegex(
+        rf"(?P<link_open>{OSC_LINK_OPEN_REGEX.pattern})"
+        rf"|(?P<link_close>{re.escape(OSC_LINK_CLOSE)})"
+        rf"|(?P<color>{COLOR_REGEX.pattern})"
+    )
 
-    REDUNDANT_COLOR_ANSI_REGEX_1 = re.compile(rf"^({COLOR_REGEX.pattern})*\x1b\[0m")
-    REDUNDANT_COLOR_ANSI_REGEX_2 = re.compile(rf"({COLOR_REGEX.pattern})*\x1b\[0m(?!$)")
-
-    REDUNDANT_PAIRS = [
-        re.compile(r"(\x1b\[[12]m)+(\x1b\[22m)"),  # Bold / Faint)
-        re.compile(r"(\x1b\[3m)+(\x1b\[23m)"),  # Italic
-        re.compile(r"(\x1b\[4m)+(\x1b\[24m)"),  # Underline
-        re.compile(r"(\x1b\[5m)+(\x1b\[25m)"),  # Blinking (slow)
-        re.compile(r"(\x1b\[7m)+(\x1b\[27m)"),  # Inverse
-        re.compile(r"(\x1b\[8m)+(\x1b\[28m)"),  # Hidden
-        re.compile(r"(\x1b\[9m)+(\x1b\[29m)"),  # Strikethrough
+    # SGR parameter -> (attribute, value). The value None turns the attribute off
+    SGR_PARAMETERS: dict[str, tuple[str, str | None]] = {
+        "1": ("intensity", "1"),  # Bold
+        "2": ("intensity", "2"),  # Faint
+        "22": ("intensity", None),
+        "3": ("italic", "3"),
+        "23": ("italic", None),
+        "4": ("underline", "4"),
+        "24": ("underline", None),
+        "5": ("blink", "5"),
+        "6": ("blink", "6"),
+        "25": ("blink", None),
+        "7": ("inverse", "7"),
+        "27": ("inverse", None),
+        "8": ("hidden", "8"),
+        "28": ("hidden", None),
+        "9": ("strikethrough", "9"),
+        "29": ("strikethrough", None),
         # Foreground colors 30–37, 90–97
-        # Expanded foreground colors (256/TrueColor)
-        # RGB foreground colors
-        re.compile(
-            r"(\x1b\[(?:3[0-7]|9[0-7])m|\x1b\[38;5;\d+m|\x1b\[38;2;\d+;\d+;\d+m)+(\x1b\[39m)"
-        ),
+        **{str(c): ("foreground", str(c)) for c in (*range(30, 38), *range(90, 98))},
+        "39": ("foreground", None),
         # Background colors 40–47, 100–107
-        # Expanded background colors (256/TrueColor)
-        # RGB background colors
-        re.compile(
-            r"(\x1b\[(?:4[0-7]|10[0-7])m|\x1b\[48;5;\d+m|\x1b\[48;2;\d+;\d+;\d+m)+(\x1b\[49m)"
-        ),
-    ]
+        **{str(c): ("background", str(c)) for c in (*range(40, 48), *range(100, 108))},
+        "49": ("background", None),
+    }
+    SGR_OFF: dict[str, str] = {
+        "intensity": "22",
+        "italic": "23",
+        "underline": "24",
+        "blink": "25",
+        "inverse": "27",
+        "hidden": "28",
+        "strikethrough": "29",
+        "foreground": "39",
+        "background": "49",
+    }
+
+    def tokenize(self, text: str) -> Iterator[tuple[str, str]]:
+        """
+        Splits the text into text runs and escape sequences in one pass
+
+        :param text: Text
+        :return: Pairs of kind ("text", "link_open", "link_close" or "color") and token
+        """
+        last = 0
+        for match in self.ANSI_TOKEN_REGEX.finditer(text):
+            start = match.start()
+            if start > last:
+                yield "text", text[last:start]
+            yield cast(str, match.lastgroup), match.group()
+            last = match.end()
+        if last < len(text):
+            yield "text", text[last:]
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def parse_sgr(sequence: str) -> tuple[tuple[str, str | None], ...] | None:
+        """
+        Cached by the sequence only and shared by all splitters
+
+        :param sequence: SGR escape sequence, for example "\x1b[1;31m"
+        :return: Changes of the attributes in order. ("reset", None) turns off all attributes.
+            None if the sequence has unsupported parameters
+        """
+        params = [param.lstrip("0") or "0" for param in sequence[2:-1].split(";")]
+        changes: list[tuple[str, str | None]] = []
+        i = 0
+        while i < len(params):
+            param = params[i]
+            if param == "0":
+                changes.append(("reset", None))
+            elif param in ("38", "48"):
+                # Expanded (256) and RGB colors
+                attribute = "foreground" if param == "38" else "background"
+                mode = params[i + 1] if i + 1 < len(params) else None
+                length = 3 if mode == "5" else 5 if mode == "2" else 0
+                color = params[i:][:length]
+                if not length or len(color) != length:
+                    return None
+                changes.append((attribute, ";".join(color)))
+                i += length
+                continue
+            elif param in AnsiTextSplitterUnsafe.SGR_PARAMETERS:
+                changes.append(AnsiTextSplitterUnsafe.SGR_PARAMETERS[param])
+            else:
+                return None
+            i += 1
+        return tuple(changes)
+
+    def sgr_transition(self, old: dict[str, str], new: dict[str, str]) -> str:
+        """
+        :param old: Current attributes
+        :param new: Required attributes
+        :return: The shortest SGR escape sequence that turns `old` into `new`
+        """
+        if old == new:
+            return ""
+        if not new:
+            return "\x1b[0m"
+
+        params = [self.SGR_OFF[attribute] for attribute in old if attribute not in new]
+        for attribute, value in new.items():
+            old_value = old.get(attribute)
+            if old_value == value:
+                continue
+            if attribute == "intensity" and old_value:
+                if value.startswith(old_value + ";"):
+                    params.append(value.removeprefix(old_value + ";"))
+                else:
+                    params.extend((self.SGR_OFF[attribute], value))
+            else:
+                params.append(value)
+
+        reset_params = ["0", *new.values()]
+        if len(";".join(reset_params)) < len(";".join(params)):
+            params = reset_params
+        return f"\x1b[{';'.join(params)}m"
+
+    def normalize_sgr(self, line: str) -> str:
+        """
+        Replaces the SGR escape sequences before each text with the shortest sequence
+        that gives the same attributes (bold, colors, etc.).
+        Lines with unsupported SGR parameters or broken escape sequences
+        are returned unchanged (removing a sequence could join the parts of a broken one)
+
+        :param line: Line with escape sequences
+        :return: Normalized line
+        """
+        result: list[str] = []
+        emitted: dict[str, str] = {}
+        state: dict[str, str] = {}
+        if "\x1b[" not in line:
+            return line
+        for kind, token in self.tokenize(line):
+            if kind != "color":
+                if kind == "text" and "\x1b" in token:
+                    return line
+                if emitted != state:
+                    result.append(self.sgr_transition(emitted, state))
+                    emitted = state.copy()
+                result.append(token)
+                continue
+
+            changes = self.parse_sgr(token)
+            if changes is None:
+                return line
+            for attribute, value in changes:
+                if attribute == "reset":
+                    state.clear()
+                    continue
+                # The order of the attributes is the order of the last changes
+                old_value = state.pop(attribute, None)
+                if value is None:
+                    continue
+                if attribute == "intensity" and old_value:
+                    if value in old_value.split(";"):
+                        value = old_value
+                    else:
+                        value = f"{old_value};{value}"
+                state[attribute] = value
+
+        if emitted != state:
+            result.append(self.sgr_transition(emitted, state))
+        return "".join(result)
+
+    def cut_text(self, text: str, max_chars: int) -> str:
+        """
+        Cuts too long text before measuring and splitting.
+        Escape sequences are not cut in half
+
+        :param text: Text
+        :param max_chars: Maximum number of characters
+        :return: The beginning of the text
+        """
+        cut = text[:max_chars]
+        # The last escape character can be the end of a link
+        last = cut.rfind("\x1b")
+        for start in (cut.rfind("\x1b", 0, last), last):
+            if start == -1:
+                continue
+            match = self.ANSI_TOKEN_REGEX.match(text, start)
+            if match and match.end() > max_chars:
+                return text[:start]
+        return cut
+
+    def escape_prefix(self, text: str, width: int | None = None) -> str:
+        """
+        Escapes the characters of the text that are unsafe for the console.
+        AnsiTextSplitterUnsafe keeps them
+
+        :param text: Text between escape sequences
+        :param width: If set, only a prefix wider than `width` is escaped and returned
+            (the text must have no escape sequences)
+        :return: Escaped text or its prefix
+        """
+        return text if width is None else cut_text_by_width(text, width)
 
     def split_text(
         self,
@@ -110,46 +332,65 @@ class AnsiTextSplitterUnsafe(BaseTextSplitter):
                 cell_break_symbol=cell_break_symbol,
             )
 
-        plain = ""
-        events: list[dict] = []
+        # Events are stored in parallel lists sorted by position in the plain text
+        plain_parts: list[str] = []
+        color_positions: list[int] = []
+        color_tokens: list[str] = []
+        link_starts: list[int] = []
+        link_urls: list[str] = []
+        link_ends: list[int] = []
         plain_idx = 0
-        i = 0
-        while i < len(text):
-            mo = self.OSC_LINK_OPEN_REGEX.match(text[i:])
-            if mo:
-                tok = mo.group(0)
-                url = mo.group("url")
-                events.append(
-                    {
-                        "type": "link_open",
-                        "plain_pos": plain_idx,
-                        "token": tok,
-                        "url": url,
-                    }
-                )
-                i += len(tok)
-                continue
-            if text.startswith(self.OSC_LINK_CLOSE, i):
-                events.append(
-                    {
-                        "type": "link_close",
-                        "plain_pos": plain_idx,
-                        "token": self.OSC_LINK_CLOSE,
-                    }
-                )
-                i += len(self.OSC_LINK_CLOSE)
-                continue
-            mc = self.COLOR_REGEX.match(text, i)
-            if mc:
-                tok = mc.group(0)
-                events.append({"type": "color", "plain_pos": plain_idx, "token": tok})
-                i += len(tok)
-                continue
-            ch = text[i]
-            plain += ch
-            if ch != "\n":
-                plain_idx += 1
-            i += 1
+        # With the width and height, the text after the visible lines is not tokenized
+        # (see get_max_plain_width) and the text with more lines gives all visible lines
+        max_plain_width = self.get_max_plain_width(width, height)
+        max_line_breaks = height or 0
+        plain_width = 0
+        line_breaks = 0
+        tokens = self.tokenize(text)
+        for kind, value in tokens:
+            if kind == "text":
+                if "\x1b" in value and "\x1b" in self.escape_prefix(value):
+                    # Broken escape sequences can join with the next text,
+                    # so the width of the text is not the sum of the widths of the parts
+                    max_plain_width = None
+                if max_plain_width is None:
+                    value = self.escape_prefix(value)
+                else:
+                    if plain_width > max_plain_width or line_breaks > max_line_breaks:
+                        # Links are paired by their order in the whole text.
+                        # The links after the cut are not visible, so the remaining
+                        # tokens are read only to pair the links opened or closed before it
+                        opens, closes = len(link_starts), len(link_ends)
+                        missing = abs(opens - closes)
+                        missing_kind = "link_close" if opens > closes else "link_open"
+                        for token_kind, _ in tokens:
+                            if not missing:
+                                break
+                            if token_kind == missing_kind:
+                                missing -= 1
+                        link_count = max(opens, closes) - missing
+                        for positions in (link_starts, link_ends):
+                            positions.extend(
+                                plain_idx + 1
+                                for _ in range(link_count - len(positions))
+                            )
+                        link_urls.extend("" for _ in range(link_count - len(link_urls)))
+                        break
+                    value = self.escape_prefix(value, max_plain_width - plain_width)
+                    plain_width += calculate_text_width(value)
+                    line_breaks += value.count("\n")
+                plain_parts.append(value)
+                plain_idx += len(value) - value.count("\n")
+            elif kind == "color":
+                color_positions.append(plain_idx)
+                color_tokens.append(value)
+            elif kind == "link_open":
+                link_starts.append(plain_idx)
+                # \x1b]8;;{url}\x1b\\
+                link_urls.append(self.escape_prefix(value)[5:-2])
+            else:
+                link_ends.append(plain_idx)
+        plain = "".join(plain_parts)
 
         lines, symbols, is_subtable, borders = super().split_text(
             text=plain,
@@ -159,110 +400,110 @@ class AnsiTextSplitterUnsafe(BaseTextSplitter):
             cell_break_symbol=cell_break_symbol,
         )
 
-        boundaries = []
-        off = 0
-        for ln in lines:
-            boundaries.append((off, off + len(ln)))
-            off += len(ln)
-
         # Собираем link spans по парам open/close
-        opens = [e for e in events if e["type"] == "link_open"]
-        closes = [e for e in events if e["type"] == "link_close"]
-        links = [
-            {
-                "url": op["url"],
-                "plain_start": op["plain_pos"],
-                "plain_end": cl["plain_pos"],
-            }
-            for op, cl in zip(opens, closes)
-        ]
-
-        # Приоритет вставки (закрытие сначала)
-        priority = {"link_close": 0, "link_open": 1, "color": 2}
+        link_count = min(len(link_starts), len(link_ends))
+        del link_starts[link_count:], link_urls[link_count:], link_ends[link_count:]
+        link_tokens = [f"\x1b]8;;{url}\x1b\\" for url in link_urls]
+
+        def active_links(position: int) -> range:
+            # Links that remain open through the position.
+            # Starts and ends are sorted, so the links form a range
+            return range(
+                bisect_right(link_ends, position), bisect_left(link_starts, position)
+            )
 
         # Восстанавливаем по строкам
         restored: list[str] = []
         inherited_color = ""
-        for (start, end), ln in zip(boundaries, lines):
+        color_index = 0
+        open_index = 0
+        close_index = 0
+        start = 0
+        active = range(0)
+        for ln in lines:
+            end = start + len(ln)
             # Ссылки, остающиеся открытыми через границу сверху
-            active = [
-                link
-                for link in links
-                if link["plain_start"] < start < link["plain_end"]
-            ]
-            prefix = inherited_color + "".join(
-                f"\x1b]8;;{link['url']}\x1b\\" for link in active
-            )
+            prefix = inherited_color + "".join(link_tokens[li] for li in active)
             out = [prefix]
             last = 0
 
-            # События в этой строке
-            evs: list[dict] = []
-            for e in events:
-                if e["type"] == "color" and start <= e["plain_pos"] < end:
-                    evs.append(e)
-            for link in links:
-                if start <= link["plain_start"] < end:
-                    evs.append(
-                        {
-                            "type": "link_open",
-                            "plain_pos": link["plain_start"],
-                            "token": f"\x1b]8;;{link['url']}\x1b\\",
-                        }
+            # События в этой строке: (position, priority, order, token)
+            # Приоритет вставки (закрытие сначала)
+            evs: list[tuple[int, int, int, str]] = []
+            while color_index < len(color_positions) and (
+                color_positions[color_index] < end
+            ):
+                evs.append(
+                    (
+                        color_positions[color_index],
+                        2,
+                        color_index,
+                        color_tokens[color_index],
                     )
-                # <-- здесь правка: ставим "<" слева, чтобы не захватывать границу start
-                if start < link["plain_end"] <= end:
+                )
+                color_index += 1
+            while open_index < link_count and link_starts[open_index] < end:
+                evs.append(
+                    (link_starts[open_index], 1, open_index, link_tokens[open_index])
+                )
+                open_index += 1
+            # Ставим "<" слева, чтобы не захватывать границу start
+            while close_index < link_count and link_ends[close_index] <= end:
+                if link_ends[close_index] > start:
                     evs.append(
-                        {
-                            "type": "link_close",
-                            "plain_pos": link["plain_end"],
-                            "token": self.OSC_LINK_CLOSE,
-                        }
+                        (link_ends[close_index], 0, close_index, self.OSC_LINK_CLOSE)
                     )
+                close_index += 1
 
             # Сортируем и вставляем
-            evs.sort(key=lambda e: (e["plain_pos"], priority[e["type"]]))
+            evs.sort()
             curr_color = inherited_color
-            for e in evs:
-                rel = e["plain_pos"] - start
+            for position, priority, _, token in evs:
+                rel = position - start
                 if rel > last:
                     out.append(ln[last:rel])
-                out.append(e["token"])
-                if e["type"] == "color":
-                    curr_color = (
-                        "" if e["token"] == "\x1b[0m" else curr_color + e["token"]
-                    )
+                out.append(token)
+                if priority == 2:
+                    curr_color = "" if token == "\x1b[0m" else curr_color + token
                 last = rel
             out.append(ln[last:])
 
             # Закрываем ссылки, выходящие за конец строки
-            for link in links:
-                if link["plain_start"] < end < link["plain_end"]:
-                    out.append(self.OSC_LINK_CLOSE)
+            active = active_links(end)
+            out.extend(self.OSC_LINK_CLOSE for _ in active)
 
             # Закрываем цвет, если он активен
             if curr_color:
                 out.append("\x1b[0m")
 
             # Убираем лишние сбросы
-            line_out = "".join(out)
-            line_out = self.REDUNDANT_COLOR_ANSI_REGEX_1.sub("", line_out)
-            line_out = self.REDUNDANT_COLOR_ANSI_REGEX_2.sub("\x1b[0m", line_out)
-
-            for regex in self.REDUNDANT_PAIRS:
-                line_out = regex.sub(r"\2", line_out)
+            line_out = self.normalize_sgr("".join(out))
 
             restored.append(line_out)
-            inherited_color = curr_color
+            inherited_color = self.normalize_sgr(curr_color)
+            start = end
 
         return restored, symbols, is_subtable, borders
 
 
 class AnsiTextSplitter(AnsiTextSplitterUnsafe):
-    ESCAPE_UNSAFE_ANSI_REGEX = re.compile(
-        r"\x1b(?!\[[0-9;]*m|]8;;|\\)"
+    UNSAFE_ESCAPE = r"\x1b(?!\[[0-9;]*m|]8;;|\\)"
+    ESCAPE_UNSAFE_ANSI_REGEX = LazyRegex(
+        rf"{UNSAFE_ESCAPE}"
         r"|[\x00-\x09\x0b-\x1a\x1c-\x1f\x7f-\x9f\u200b-\u200d\uFEFF]"
     )
+    # The text is escaped token by token, so a link can hold escape characters
+    # that are escaped in its url
+    ANSI_TOKEN_REGEX = LazyRegex(
+        rf"(?P<link_open>\x1b]8;;(?P<url>(?:[^\x1b]|{UNSAFE_ESCAPE})+)\x1b\\)"
+        r"|(?P<link_close>\x1b]8;;\x1b\\)"
+        r"|(?P<color>\x1b\[[0-9;]*m)"
+    )
+
+    def escape_prefix(self, text: str, width: int | None = None) -> str:
+        if width is not None:
+            text = cut_text_by_width(text, width)
+        return self.ESCAPE_UNSAFE_ANSI_REGEX.sub(lambda m: repr(m[0])[1:-1], text)
 
     def split_text(
         self,
@@ -272,12 +513,19 @@ class AnsiTextSplitter(AnsiTextSplitterUnsafe):
         line_break_symbol: str = "/",
         cell_break_symbol: str = "…",
     ) -> tuple[list[str], list[str], bool, dict[str, tuple[str, ...]]]:
-        text = self.ESCAPE_UNSAFE_ANSI_REGEX.sub(
-            lambda m: repr(m[0])[1:-1],
-            text,
-        )
-        return super().split_text(
-            text=text,
+        if "\x1b" in text:
+            # The text tokens are escaped up to the visible lines
+            return super().split_text(
+                text=text,
+                width=width,
+                height=height,
+                line_break_symbol=line_break_symbol,
+                cell_break_symbol=cell_break_symbol,
+            )
+
+        return BaseTextSplitter.split_text(
+            self,
+            text=self.escape_prefix(text, self.get_max_plain_width(width, height)),
             width=width,
             height=height,
             line_break_symbol=line_break_symbol,
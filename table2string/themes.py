@@ -1,5 +1,5 @@
 from typing import Optional
-from functools import lru_cache
+from functools import cached_property
 from dataclasses import dataclass
 
 
@@ -173,6 +173,29 @@ class Theme:
         self.name = name
         self.border = border
         self.custom_sub_table_theme = custom_sub_table_theme or self
+        # Separators of utils.generate_borders by the widths of the columns
+        self.border_strings: dict[tuple[int, ...], tuple[str, ...]] = {}
+
+    @cached_property
+    def junctions(self) -> dict[tuple[str, str, str], str]:
+        """
+        Characters that connect the borders of a table and a subtable:
+        (side, border_from, border_to) -> connected border.
+        Calculated on first use
+        """
+        border = self.border
+        junctions: dict[tuple[str, str, str], str] = {}
+        for side, translations in translate_border_dict.items():
+            for (name_from, name_to), name in translations.items():
+                border_from = getattr(border, name_from)
+                border_to = getattr(border, name_to)
+                # A character of several borders has the name from get_border_name
+                if (
+                    border.get_border_name(border_from) == name_from
+                    and border.get_border_name(border_to) == name_to
+                ):
+                    junctions[(side, border_from, border_to)] = getattr(border, name)
+        return junctions
 
     def __repr__(self):
         if self.name in (
@@ -625,12 +648,11 @@ translate_border_dict: dict[str, dict[tuple[str, str], str]] = {
 }
 
 
-@lru_cache(maxsize=100)
 def translate_theme_border(
     side: str, theme: Theme, border_from: str, border_to: str
 ) -> str:
     """
-    Used to connect table boundaries to a subtable
+    Used to connect table boundaries to a subtable (see Theme.junctions)
 
     :param side: "border_left" or "border_right" or "border_top" or "border_bottom"
     :param theme: Theme
@@ -638,12 +660,4 @@ def translate_theme_border(
     :param border_to: The border to be attached
     :return: Connected borders (if possible)
     """
-    border_from_name: str = theme.border.get_border_name(border_from) or ""
-    border_to_name: str = theme.border.get_border_name(border_to) or ""
-    border_result: str | None = translate_border_dict[side].get(
-        (border_from_name, border_to_name)
-    )
-
-    if border_result:
-        return getattr(theme.border, border_result)
-    return border_from
+    return theme.junctions.get((side, border_from, border_to), border_from)
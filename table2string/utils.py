@@ -1,17 +1,48 @@
 import re
-import shutil
+import threading
 import unicodedata
-from typing import TypeVar
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+from typing import Any, Iterator, NamedTuple, TextIO, TypeVar
 
-from table2string.themes import Theme, Themes, translate_theme_border
+from table2string.themes import Theme, Themes
 from table2string.aligns import HorizontalAlignment, VerticalAlignment
 
-
 T = TypeVar("T")
-OSC8_LINK_REGEX = re.compile(
+
+
+class LazyRegex:
+    """
+    A regular expression that is compiled on first use.
+    A class attribute is replaced by the compiled regular expression on first access
+    """
+
+    def __init__(self, pattern: str, flags: int = 0):
+        self.pattern = pattern
+        self.flags = flags
+        self.regex: re.Pattern[str] | None = None
+
+    def compile(self) -> re.Pattern[str]:
+        if self.regex is None:
+            self.regex = re.compile(self.pattern, self.flags)
+        return self.regex
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.owner = owner
+        self.name = name
+
+    def __get__(self, instance: Any, owner: type) -> re.Pattern[str]:
+        regex = self.compile()
+        setattr(self.owner, self.name, regex)
+        return regex
+
+
+OSC8_LINK_REGEX = LazyRegex(
     r"(?s)\x1b]8;;.*?(?:\x07|\x1b\\)(?P<text>.*?)\x1b]8;;.*?(?:\x07|\x1b\\)"
 )
-INVISIBLE_REGEX = re.compile(
+INVISIBLE_REGEX = LazyRegex(
     r"""(?xs)
 (?:
     \x1b\[[0-?]*[ -/]*[@-~]                  # CSI: ESC [ ... final
@@ -23,27 +54,306 @@ INVISIBLE_REGEX = re.compile(
 )
 """
 )
+INVISIBLE_CHARS = frozenset(
+    (
+        *map(chr, range(0x00, 0x20)),
+        *map(chr, range(0x7F, 0xA0)),
+        "\u200b",
+        "\u200c",
+        "\u200d",
+        "\ufeff",
+    )
+)
+# Printable characters before this one are all one column wide
+# (combining characters start at U+0300 and wide characters at U+1100)
+NARROW_CHARS_END = "\u0300"
+
+
+class CharWidthTable(dict):
+    """
+    Bounded codepoint width lookup table.
+    The width of a character is calculated by unicodedata the first time it is seen,
+    so the table matches the unicodedata of the running interpreter
+    and only contains characters from the rendered text.
+    When the table is full, the widths of new characters are calculated on every lookup
+    """
+
+    def __init__(self, maxsize: int = 16384):
+        """
+        :param maxsize: Maximum number of stored characters
+        """
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __missing__(self, char: str) -> int:
+        if char in INVISIBLE_CHARS:
+            width = 0
+        elif unicodedata.east_asian_width(char) in "WF":
+            width = 2
+        elif unicodedata.combining(char):
+            width = 0
+        else:
+            width = 1
+        if len(self) < self.maxsize:
+            self[char] = width
+        return width
+
+
+CHAR_WIDTHS = CharWidthTable()
+
+
+def is_narrow_text(text: str) -> bool:
+    """
+    Checks that each character of the text takes exactly one column in the console
+    (printable ASCII and Latin-1 without escape sequences)
+
+    :param text: Text
+    :return: True if the width of the text is equal to its length
+    """
+    return text.isprintable() and (text.isascii() or max(text) < NARROW_CHARS_END)
 
 
 def get_text_width_in_console(text: str) -> int:
     """
     Calculates the length of the text in the console
     Some special characters and emoji
+    Uses the width cache if it is enabled (see `set_width_cache` and `use_width_cache`)
 
     :param text: Text
     :return: Calculates the length of the text in the console
     """
-    text = OSC8_LINK_REGEX.sub(lambda m: m.group("text"), text)
-    text = INVISIBLE_REGEX.sub("", text)
-    width = 0
-    for char in text:
-        if unicodedata.east_asian_width(char) in "WF":
-            width += 2
-        elif unicodedata.combining(char):
-            width += 0
-        else:
-            width += 1
-    return width
+    if is_narrow_text(text):
+        return len(text)
+    cache = get_width_cache()
+    if cache is not None:
+        return cache.get_width(text)
+    return calculate_text_width(text)
+
+
+def calculate_text_width(text: str) -> int:
+    """
+    Calculates the length of the text in the console without the width cache
+
+    :param text: Text
+    :return: Calculates the length of the text in the console
+    """
+    if is_narrow_text(text):
+        return len(text)
+    if "\x1b" in text:
+        text = OSC8_LINK_REGEX.compile().sub(lambda m: m.group("text"), text)
+        text = INVISIBLE_REGEX.compile().sub("", text)
+    return sum(map(CHAR_WIDTHS.__getitem__, text))
+
+
+class WidthCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class WidthCache:
+    """
+    Bounded LRU cache of text widths in the console.
+    Useful when the same values are repeated in the table many times.
+
+    EXAMPLE
+
+    cache = WidthCache(maxsize=1024)
+    set_width_cache(cache)                 # for the whole process
+    print_table(table, width_cache=cache)  # or for one call
+    cache.info()                           # WidthCacheInfo(hits=..., misses=..., ...)
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        """
+        :param maxsize: Maximum number of cached texts
+        """
+        if maxsize < 1:
+            raise ValueError(f"maxsize={maxsize}")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._widths: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_width(self, text: str) -> int:
+        """
+        Returns the cached width of the text or calculates and caches it
+
+        :param text: Text
+        :return: Calculates the length of the text in the console
+        """
+        with self._lock:
+            width = self._widths.get(text)
+            if width is not None:
+                self._widths.move_to_end(text)
+                self.hits += 1
+                return width
+
+        width = calculate_text_width(text)
+
+        with self._lock:
+            self.misses += 1
+            self._widths[text] = width
+            if len(self._widths) > self.maxsize:
+                self._widths.popitem(last=False)
+                self.evictions += 1
+        return width
+
+    def info(self) -> WidthCacheInfo:
+        return WidthCacheInfo(
+            self.hits, self.misses, self.evictions, self.maxsize, len(self._widths)
+        )
+
+    def clear(self) -> None:
+        """
+        Removes all cached widths and resets the statistics
+        """
+        with self._lock:
+            self._widths.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def __repr__(self):
+        return f"WidthCache(maxsize={self.maxsize})"
+
+
+process_width_cache: WidthCache | None = None
+call_width_cache: ContextVar[WidthCache | None] = ContextVar(
+    "call_width_cache", default=None
+)
+
+
+def set_width_cache(cache: WidthCache | None) -> None:
+    """
+    Enables the width cache for the whole process or disables it if `cache` is None
+
+    :param cache: WidthCache or None
+    """
+    global process_width_cache
+    process_width_cache = cache
+
+
+def get_width_cache() -> WidthCache | None:
+    """
+    :return: The width cache of the current call or of the process
+    """
+    cache = call_width_cache.get()
+    if cache is None:
+        return process_width_cache
+    return cache
+
+
+@contextmanager
+def use_width_cache(cache: WidthCache | None) -> Iterator[None]:
+    """
+    Enables the width cache inside the `with` block.
+    If `cache` is None, the process width cache is used
+
+    :param cache: WidthCache or None
+    """
+    token = call_width_cache.set(cache)
+    try:
+        yield
+    finally:
+        call_width_cache.reset(token)
+
+
+def get_char_width(char: str) -> int:
+    """
+    Calculates the width of a single character in the console.
+    Matches `get_text_width_in_console` for text without escape sequences
+
+    :param char: One character
+    :return: 0, 1 or 2
+    """
+    return CHAR_WIDTHS[char]
+
+
+def cut_text_by_width(text: str, width: int) -> str:
+    """
+    Cuts the text without escape sequences to a prefix that is wider than `width`.
+    Prefixes of doubling length are measured, so only the beginning of a long text is scanned
+
+    :param text: Text without escape sequences
+    :param width: Width
+    :return: Prefix of the text or the whole text if it is not wider than `width`
+    """
+    size = max(width, 1)
+    while size < len(text):
+        if calculate_text_width(text[:size]) > width:
+            break
+        size *= 2
+    return text[:size]
+
+
+def wrap_line(line: str, width: int, max_parts: int | None = None) -> list[str]:
+    """
+    Splits one line without line breaks into parts of the desired width.
+    The width of each character is calculated once and the line is scanned once.
+    Lines with escape sequences are split by measuring prefixes,
+    because the width of a sequence cut in half differs from the width of its parts.
+
+    :param line: Line without line breaks
+    :param width: Width
+    :param max_parts: Maximum number of parts. The rest of the line is not scanned
+    :return: List of parts
+    """
+    assert width >= 1, width
+
+    parts: list[str] = []
+
+    if "\x1b" in line:
+        while line and (max_parts is None or len(parts) < max_parts):
+            if get_text_width_in_console(line) <= width:
+                parts.append(line)
+                line = ""
+            else:
+                w = 0
+                while get_text_width_in_console(line[:w]) <= width - 1:
+                    w += 1
+                parts.append(line[:w])
+                line = line[w:]
+        return parts
+
+    if max_parts is not None:
+        # Each part is at most width + 1 columns wide,
+        # so the text after this prefix does not change the first parts
+        line = cut_text_by_width(line, (max_parts + 1) * (width + 1))
+
+    if is_narrow_text(line):
+        for start in range(0, len(line), width):
+            end = start + width
+            parts.append(line[start:end])
+        return parts[:max_parts]
+
+    char_widths = list(map(CHAR_WIDTHS.__getitem__, line))
+    remaining_width = sum(char_widths)
+    start = 0
+
+    while start < len(line):
+        if remaining_width <= width:
+            parts.append(line[start:])
+            break
+
+        # Take characters while the part is narrower than the width.
+        # The last character can make the part wider than the width (wide characters)
+        part_width = 0
+        end = start
+        while part_width <= width - 1:
+            part_width += char_widths[end]
+            end += 1
+
+        parts.append(line[start:end])
+        remaining_width -= part_width
+        start = end
+
+    return parts[:max_parts]
 
 
 def proportional_change(
@@ -68,6 +378,8 @@ def proportional_change(
     then it can be treated as a list whose length is `row_widths`, and all values are 1.
     Fractal numbers and numbers less than one are not allowed.
     The `proportion_coefficient` argument is the coefficient for reducing large numbers.
+    The rounding errors are distributed one unit per column starting from the first column,
+    in O(n log n) regardless of the difference.
 
     :param row_widths: List of widths for each column
     :param max_width: Max table width (Required sum for `row_widths`)
@@ -94,53 +406,97 @@ def proportional_change(
         max(m, n + round(difference * p))
         for n, p, m in zip(row_widths, proportions, min_row_widths)
     ]
+    column_count = len(distributed)
 
     total = sum(distributed)
     final_difference = max_width - total
 
-    # We adjust if the final amount is more or less than the target
+    # We adjust if the final amount is more or less than the target.
+    # One pass over the columns, the columns at the minimum are passed too
     if final_difference > 0:
-        for i in range(final_difference):
-            idx = i % len(distributed)
-            distributed[idx] += 1
+        distributed = add_in_passes(distributed, final_difference)
     elif final_difference < 0:
-        for i in range(-final_difference):
-            idx = i % len(distributed)
-            if distributed[idx] > min_row_widths[idx]:
-                distributed[idx] -= 1
+        passes, remainder = divmod(-final_difference, column_count)
+        distributed = [
+            max(m, n - passes - (i < remainder))
+            for i, (n, m) in enumerate(zip(distributed, min_row_widths))
+        ]
 
     # Reduction of large values by a coefficient
-    for i in range(len(distributed)):
-        distributed[i] = max(
+    total = sum(distributed)
+    for i in range(column_count):
+        # The values before `i` are already reduced
+        reduced = max(
             min_row_widths[i],
             distributed[i]
             - round(distributed[i] * proportion_coefficient)
-            + round(sum(distributed) * proportion_coefficient / len(distributed)),
+            + round(total * proportion_coefficient / column_count),
         )
+        total += reduced - distributed[i]
+        distributed[i] = reduced
 
     # Checking and final adjustment of the amount
-    total = sum(distributed)
     final_difference = max_width - total
 
-    while final_difference != 0:
-        if final_difference > 0:
-            for i in range(len(distributed)):
-                if distributed[i] < max_width - (len(distributed) - 1):
-                    distributed[i] += 1
-                    final_difference -= 1
-                    if final_difference == 0:
-                        break
-        elif final_difference < 0:
-            for i in range(len(distributed)):
-                if distributed[i] > min_row_widths[i]:
-                    distributed[i] -= 1
-                    final_difference += 1
-                    if final_difference == 0:
-                        break
+    if final_difference > 0:
+        # While the sum is less than max_width, every column is less than
+        # max_width - (column_count - 1), so no column is skipped
+        distributed = add_in_passes(distributed, final_difference)
+    elif final_difference < 0:
+        distributed = subtract_in_passes(distributed, min_row_widths, -final_difference)
 
     return tuple(distributed)
 
 
+def add_in_passes(values: list[int], amount: int) -> list[int]:
+    """
+    Adds one to each value in passes from the first value until `amount` is added
+
+    :param values: Values
+    :param amount: Sum of the additions
+    :return: New values
+    """
+    passes, remainder = divmod(amount, len(values))
+    return [n + passes + (i < remainder) for i, n in enumerate(values)]
+
+
+def subtract_in_passes(
+    values: list[int], min_values: tuple[int, ...], amount: int
+) -> list[int]:
+    """
+    Subtracts one from each value greater than its minimum in passes
+    from the first value until `amount` is subtracted.
+    The number of full passes is found from the sorted surpluses
+
+    :param values: Values
+    :param min_values: Minimum values
+    :param amount: Sum of the subtractions, not greater than the sum of the surpluses
+    :return: New values
+    """
+    surpluses = [n - m for n, m in zip(values, min_values)]
+    passes = remainder = 0
+    sorted_surpluses = sorted(surpluses)
+    for i, surplus in enumerate(sorted_surpluses):
+        # Values with a surplus greater than `passes`
+        count = len(sorted_surpluses) - i
+        step = (surplus - passes) * count
+        if step >= amount:
+            full_passes, remainder = divmod(amount, count)
+            passes += full_passes
+            break
+        amount -= step
+        passes = surplus
+
+    result = []
+    for n, surplus in zip(values, surpluses):
+        if surplus > passes and remainder:
+            result.append(n - passes - 1)
+            remainder -= 1
+        else:
+            result.append(n - min(surplus, passes))
+    return result
+
+
 def transform_align(
     column_count: int,
     align: (
@@ -243,6 +599,43 @@ def transform_value(value: T | tuple[T, ...], column_count: int) -> tuple[T, ...
         )[:column_count]
 
 
+FLOAT_WORDS = frozenset(("nan", "inf", "infinity"))
+
+
+def is_number(value: Any) -> bool:
+    """
+    Checks the type of the value without converting it to a string.
+    Subclasses are not counted, because their str may differ
+
+    :param value: Original value of the cell
+    :return: True if str(value) is always accepted by float
+    """
+    value_type = type(value)
+    if value_type is int or value_type is float:
+        return True
+    if value_type is Decimal:
+        return not value.is_snan()
+    return False
+
+
+def is_number_text(text: str) -> bool:
+    """
+    Same as successful float(text), but text without digits
+    is rejected without raising an exception
+
+    :param text: Text
+    :return: True if float(text) does not raise ValueError
+    """
+    if not any(map(str.isdigit, text)):
+        if text.strip().lstrip("+-").lower() not in FLOAT_WORDS:
+            return False
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
 def split_text_for_sub_table(
     string_sub_table: str, max_height: int | None = None
 ) -> tuple[list[str], list[str], bool, dict[str, tuple[str, ...]]]:
@@ -283,6 +676,7 @@ def fill_line(
     h_align: tuple[str, ...],
     v_align: tuple[str, ...],
     theme: Theme = Themes.ascii_thin,
+    numbers: tuple[bool, ...] | None = None,
 ) -> str:
     """
     Fills the line
@@ -295,6 +689,8 @@ def fill_line(
     :param h_align: Tuple of horizontal alignments
     :param v_align: Tuple of vertical alignments
     :param theme: Theme
+    :param numbers: Cells which are known to be numbers for HorizontalAlignment.AUTO.
+        The other cells are checked by their lines
     :return: Filled line
     """
     h_align_left, h_align_right = [], []
@@ -311,18 +707,24 @@ def fill_line(
             and h_align_right[n] in ("<", ">")
             and len(raw_lines) > 1
         ):
-            max_width = len(max(raw_lines, key=len))
-            raw_lines[:] = [
-                f"{r:{h_align_right[n]}{max_width}}" for _n, r in enumerate(raw_lines)
-            ]
+            # Padded by the width in the console, so escape sequences are not counted
+            line_widths = list(map(get_text_width_in_console, raw_lines))
+            max_width = max(line_widths)
+            if h_align_right[n] == "<":
+                raw_lines[:] = [
+                    r + " " * (max_width - w) for r, w in zip(raw_lines, line_widths)
+                ]
+            else:
+                raw_lines[:] = [
+                    " " * (max_width - w) + r for r, w in zip(raw_lines, line_widths)
+                ]
             h_align_right[n] = "^"
 
         if h_align_left[n] == "*" or h_align_right[n] == "*":
-            try:
-                float("\n".join(raw_lines))
+            if (numbers and numbers[n]) or is_number_text("\n".join(raw_lines)):
                 h_align_left[n] = ">"
                 h_align_right[n] = ">"
-            except ValueError:
+            else:
                 h_align_left[n] = "<"
                 h_align_right[n] = "<"
 
@@ -332,6 +734,7 @@ def fill_line(
     result_lines: list[str] = []
     symbols = list(zip(*columns_symbols))
     vertical = theme.border.vertical
+    junctions = theme.junctions
     tags = [False for _ in subtable_columns]
     lines: tuple[str, ...]
 
@@ -353,19 +756,16 @@ def fill_line(
                 border_data: dict[str, tuple[str, ...]] = border_data_list[ri]
                 if ri == 0:
                     template_list.append(
-                        translate_theme_border(
-                            "border_left",
-                            theme,
+                        junctions.get(
+                            ("border_left", vertical, border_data["border_left"][0]),
                             vertical,
-                            border_data["border_left"][0],
                         )
                     )
                 elif ri == row_length - 1:
-                    template_list[-1] = translate_theme_border(
-                        "border_right",
-                        theme,
-                        template_list[-1] or vertical,
-                        border_data["border_right"][-1],
+                    border_from = template_list[-1] or vertical
+                    template_list[-1] = junctions.get(
+                        ("border_right", border_from, border_data["border_right"][-1]),
+                        border_from,
                     )
 
                 try:
@@ -376,20 +776,18 @@ def fill_line(
                     border_right_ri = " "
 
                 if template_list:
+                    border_from = template_list[-1] or vertical
                     template_list[-1] = (
-                        translate_theme_border(
-                            "border_left",
-                            theme,
-                            template_list[-1] or vertical,
-                            border_left_ri,
+                        junctions.get(
+                            ("border_left", border_from, border_left_ri), border_from
                         )
                         or template_list[-1]
                     )
 
                 template_list.append(f"{{:<{widths[ri] + 2}}}")
 
-                border_right = translate_theme_border(
-                    "border_right", theme, vertical, border_right_ri
+                border_right = junctions.get(
+                    ("border_right", vertical, border_right_ri), vertical
                 )
                 template_list.append(border_right)
             else:
@@ -452,12 +850,14 @@ def apply_border_data(
     Connects table and subtable boundaries
 
     :param string_border: String border
-    :param side: "border_left" or "border_right" or "border_top" or "border_bottom"
+    :param side: "border_top" or "border_bottom"
     :param theme: Theme
     :param border_data_list: Tuple of dictionaries to join boundaries
     :param max_widths: List of widths for each column
     """
     string_border_list = list(string_border)
+    junctions = theme.junctions
+    horizontal = theme.border.horizontal
     index = 2
 
     for current_border_data, width in zip(border_data_list, max_widths):
@@ -465,17 +865,10 @@ def apply_border_data(
             for border_r in current_border_data[side]:
                 border_l = string_border_list[index]
                 if border_l == " ":
-                    border_l = theme.border.horizontal
-                if side == "border_top":
-                    string_border_list[index] = (
-                        translate_theme_border(side, theme, border_l, border_r)
-                        or border_l
-                    )
-                elif side == "border_bottom":
-                    string_border_list[index] = (
-                        translate_theme_border(side, theme, border_l, border_r)
-                        or border_l
-                    )
+                    border_l = horizontal
+                string_border_list[index] = (
+                    junctions.get((side, border_l, border_r), border_l) or border_l
+                )
                 index += 1
         else:
             index += width
@@ -483,17 +876,71 @@ def apply_border_data(
     return "".join(string_border_list)
 
 
+class LineWriter:
+    """
+    Collects lines and writes them to the file in large blocks
+    instead of calling file.write for every line
+    """
+
+    def __init__(self, file: TextIO, buffer_size: int = 65536):
+        """
+        :param file: File where you can record the lines by .write method
+        :param buffer_size: Minimum number of characters in one write.
+            If 0, each line is written immediately
+        """
+        self.file = file
+        self.buffer_size = buffer_size
+        self.buffer: list[str] = []
+        self.buffered = 0
+        self.first_line = True
+
+    def write_line(self, line: str) -> None:
+        """
+        Adds a line. The lines are separated by line breaks
+
+        :param line: Line without line break
+        """
+        if self.first_line:
+            self.first_line = False
+        else:
+            line = "\n" + line
+        self.write(line)
+
+    def write(self, text: str) -> None:
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the buffered text to the file
+        """
+        if self.buffer:
+            self.file.write("".join(self.buffer))
+            self.buffer.clear()
+            self.buffered = 0
+
+
 def terminal_size(default: tuple[int, int] = (120, 30)) -> tuple[int, int]:
     """
     :param default: Will be returned if it is not possible to get the console size
     :return: columns, lines
     """
+    import shutil  # only for terminal_size, to import table2string faster
+
     size = shutil.get_terminal_size(default)
     return size.columns, size.lines
 
 
+# Maximum number of widths with cached separators for each theme
+BORDER_STRINGS_CACHE_SIZE = 256
+
+
 def generate_borders(theme: Theme, max_widths: tuple[int, ...]) -> tuple[str, ...]:
     """
+    The separators are cached in the theme by the widths of the columns
+
     EXAMPLE
 
     theme                = Themes.thin_double
@@ -515,6 +962,10 @@ def generate_borders(theme: Theme, max_widths: tuple[int, ...]) -> tuple[str, ..
         down_separator,
     )
     """
+    border_strings = theme.border_strings.get(max_widths)
+    if border_strings is not None:
+        return border_strings
+
     horizontally = [(theme.border.horizontal * (i + 2)) for i in max_widths]
     up_separator = "".join(
         (
@@ -561,7 +1012,7 @@ def generate_borders(theme: Theme, max_widths: tuple[int, ...]) -> tuple[str, ..
             theme.border.bottom_right,
         )
     )
-    return (
+    border_strings = (
         up_separator,
         under_name_separator,
         up_noname_separator,
@@ -569,3 +1020,7 @@ def generate_borders(theme: Theme, max_widths: tuple[int, ...]) -> tuple[str, ..
         line_separator_plus,
         down_separator,
     )
+    if len(theme.border_strings) >= BORDER_STRINGS_CACHE_SIZE:
+        theme.border_strings.clear()
+    theme.border_strings[max_widths] = border_strings
+    return border_strings
@@ -0,0 +1,93 @@
+import os
+import sys
+import tempfile
+import textwrap
+import subprocess
+
+
+# Imported only by the functions that use them
+LAZY_MODULES = ("csv", "random", "shutil", "concurrent.futures", "multiprocessing")
+# The stdlib module whose import time is the reference for the import time budget.
+# It is imported first, so the modules they share are counted only for it
+REFERENCE_MODULE = "dataclasses"
+# table2string imports in about 0.7 of the time of the reference module,
+# importing the lazy modules or 20 ms more of work takes more than 1.3 of it
+IMPORT_TIME_BUDGET = 1.2
+
+
+def run_python(
+    *args: str, env: dict[str, str] | None = None
+) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True, env=env
+    )
+
+
+def test_lazy_imports():
+    code = (
+        "import sys, table2string\n"
+        f"print(*[module for module in {LAZY_MODULES!r} if module in sys.modules])\n"
+    )
+    result = run_python("-c", code)
+    assert result.stdout.split() == [], result.stdout
+
+
+def test_lazy_regexes_and_themes():
+    # Regexes are compiled and theme borders are calculated on first use
+    code = textwrap.dedent(
+        """
+        import re, sys, table2string
+        from table2string.utils import LazyRegex
+        from table2string.themes import Theme, Themes
+
+        for name, module in list(sys.modules.items()):
+            if not name.startswith("table2string"):
+                continue
+            for value in vars(module).values():
+                values = [value, *vars(value).values()] if isinstance(value, type) else [value]
+                for value in values:
+                    if isinstance(value, re.Pattern) or (
+                        isinstance(value, LazyRegex) and value.regex is not None
+                    ):
+                        print(name, repr(value.pattern))
+        for theme in vars(Themes).values():
+            if isinstance(theme, Theme) and ("junctions" in vars(theme) or theme.border_strings):
+                print(theme.name)
+        """
+    )
+    result = run_python("-c", code)
+    assert result.stdout.split() == [], result.stdout
+
+
+def test_import_time():
+    def get_cumulative_times() -> dict[str, int]:
+        result = run_python(
+            "-X",
+            f"pycache_prefix={pycache_prefix}",
+            "-X",
+            "importtime",
+            "-c",
+            f"import {REFERENCE_MODULE}; import table2string",
+            env=env,
+        )
+        # import time: self [us] | cumulative | imported package
+        times = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            _, cumulative, module = line.split("|")
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+        return times
+
+    # The first run compiles the bytecode, as the stdlib is already compiled
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    with tempfile.TemporaryDirectory() as pycache_prefix:
+        get_cumulative_times()
+        ratios = []
+        for _ in range(5):
+            times = get_cumulative_times()
+            ratios.append(times["table2string"] / times[REFERENCE_MODULE])
+
+    # The fastest run is the least affected by the load of the machine
+    assert min(ratios) < IMPORT_TIME_BUDGET, ratios
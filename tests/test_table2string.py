@@ -1,10 +1,26 @@
 import sys
 import sqlite3
+import threading
 from io import StringIO
 from typing import Callable
 from functools import wraps
 
-from table2string import print_table, stringify_table, Table, Themes
+from table2string import (
+    print_table,
+    stringify_table,
+    iter_table_lines,
+    render_many,
+    TableLayout,
+    TablePaginator,
+    WidthSample,
+    SubTableCache,
+    Table,
+    Themes,
+    WidthCache,
+    AnsiTextSplitter,
+)
+from table2string.utils import get_width_cache
+from table2string.table2string import get_column_panels
 
 
 def get_output(func: Callable):
@@ -443,6 +459,20 @@ Never gonna tell a lie and hurt you
 +------------------------------------------------------------------------+
 """.strip()
     )
+    # The lines are padded by their width in the console
+    colored = [("\x1b[31mab\x1b[0m\nabcd", "\u4e00\u4e00\nab")]
+    assert stringify_table(colored, h_align="^<", max_width=(10, 8)) == (
+        "+------------+----------+\n"
+        "|    \x1b[31mab\x1b[0m      |   \u4e00\u4e00   |\n"
+        "|    abcd    |   ab     |\n"
+        "+------------+----------+"
+    )
+    assert stringify_table(colored, h_align="^>", max_width=(10, 8)) == (
+        "+------------+----------+\n"
+        "|      \x1b[31mab\x1b[0m    |   \u4e00\u4e00   |\n"
+        "|    abcd    |     ab   |\n"
+        "+------------+----------+"
+    )
     table_14 = [("filler " * 2,), ("12345\n67890",)]
     assert (
         stringify_table(table_14, h_align="<>")
@@ -1537,3 +1567,677 @@ def test_column_names():
 ╰───────┴────────┴─────────╯
 """.strip()
     )
+
+
+def test_stream():
+    file = StringIO()
+
+    def rows():
+        yield "1", "2"
+        yield "333", "4"
+        # The first rows are already written
+        assert file.getvalue() == ("+-----+---+\n|   1 | 2 |\n+-----+---+\n| 333 | 4 |")
+        yield "5", "66666"
+
+    print_table(rows(), stream=True, stream_sample_size=2, buffer_size=0, file=file)
+    assert (
+        file.getvalue()
+        == """
++-----+---+
+|   1 | 2 |
++-----+---+
+| 333 | 4 |
++-----+---+
+|   5 | 6/|
+|     | 6/|
+|     | 6/|
+|     | 6/|
+|     | 6 |
++-----+---+
+""".lstrip()
+    )
+
+    file = StringIO()
+    print_table(
+        iter([("1", "2", "3"), ("4", "55555", "6")]),
+        stream=True,
+        max_width=(1, 3),
+        column_names=("a", "b", "c"),
+        file=file,
+    )
+    assert (
+        file.getvalue()
+        == """
++---+-----+-----+
+| a |  b  |  c  |
++---+-----+-----+
+| 1 |   2 |   3 |
++---+-----+-----+
+| 4 | 555/|   6 |
+|   | 55  |     |
++---+-----+-----+
+""".lstrip()
+    )
+
+    table = [("1", "22"), ("333", "4"), ("5", "6")]
+    assert stringify_table(table) == get_output(print_table)(
+        iter(table), stream=True, end=""
+    )
+
+    # A subtable wider than its column is clipped
+    file = StringIO()
+    sub_table = Table([("aaaa", "bbbb")])
+    print_table(
+        iter([(1, "x"), (2, sub_table)]), stream=True, stream_sample_size=1, file=file
+    )
+    assert (
+        file.getvalue()
+        == """
++---+---+
+| 1 | x |
++---+---+
+| 2 | +…|
+|   | |…|
+|   | +…|
++---+---+
+""".lstrip()
+    )
+
+    # The rows must have the number of columns of the first rows
+    for rows in (
+        [("1", "2", "3"), ("4", "5", "6", "7")],
+        [("1", "2", "3"), ("4",)],
+    ):
+        file = StringIO()
+        try:
+            print_table(iter(rows), stream=True, stream_sample_size=1, file=file)
+        except ValueError:
+            pass
+        else:
+            assert False
+
+
+def test_iter_lines():
+    table = Table([("1", "2\n3"), ("4", "5")], name="Name", column_names=("a", "b"))
+    assert list(table.iter_lines()) == table.stringify().splitlines()
+    assert list(table.iter_lines(theme=Themes.markdown)) == (
+        table.stringify(theme=Themes.markdown).splitlines()
+    )
+
+    consumed = []
+
+    def rows():
+        for i in range(1_000_000):
+            consumed.append(i)
+            yield str(i), "\U0001f34f"
+
+    lines = iter_table_lines(rows(), stream=True, stream_sample_size=2)
+    assert consumed == []
+    assert [next(lines) for _ in range(4)] == [
+        "+---+----+",
+        "| 0 | \U0001f34f |",
+        "+---+----+",
+        "| 1 | \U0001f34f |",
+    ]
+    assert consumed == [0, 1]
+
+    cache = WidthCache()
+    lines = table.iter_lines(width_cache=cache)
+    next(lines)
+    assert get_width_cache() is None
+    lines.close()
+
+
+def test_buffer_size():
+    class File:
+        def __init__(self):
+            self.writes = []
+
+        def write(self, text):
+            self.writes.append(text)
+
+    table = [(str(i), "x" * 10) for i in range(100)]
+    expected = stringify_table(table, end="\n")
+
+    file = File()
+    print_table(table, file=file)
+    assert file.writes == [expected]
+
+    file = File()
+    print_table(table, file=file, buffer_size=100)
+    assert "".join(file.writes) == expected
+    assert 1 < len(file.writes) < expected.count("\n")
+    assert all(len(text) >= 100 for text in file.writes[:-1])
+
+    file = File()
+    print_table(table, file=file, buffer_size=0)
+    assert "".join(file.writes) == expected
+    assert len(file.writes) == expected.count("\n") + 1
+
+
+def test_table_layout():
+    layout = TableLayout(
+        (2, 5),
+        name="Users",
+        column_names=("id", "name"),
+        h_align=("<", ">"),
+    )
+    assert layout.render([(1, "Alice"), (2, "Bob")]) == (
+        """
++------------+
+|   Users    |
++----+-------+
+| id | name  |
++----+-------+
+| 1  | Alice |
++----+-------+
+| 2  |   Bob |
++----+-------+
+""".strip()
+    )
+    assert layout.render([(3, "Eve")]) == (
+        """
++------------+
+|   Users    |
++----+-------+
+| id | name  |
++----+-------+
+| 3  |   Eve |
++----+-------+
+""".strip()
+    )
+
+    for kwargs in (
+        {},
+        {"name": "Name", "column_names": ("a", "b", "c")},
+        {"max_width": 15, "sep": False, "theme": Themes.rounded_thick},
+        {"max_width": (3, 1), "max_height": 2, "v_align": "-"},
+    ):
+        table = [("1", "22", "333"), ("4444", "5\n55", "6"), ("a" * 10, "b", "")]
+        layout = TableLayout.from_table(table, **kwargs)
+        assert layout.render(table) == stringify_table(table, **kwargs)
+        assert list(layout.iter_lines(table)) == stringify_table(table, **kwargs).split(
+            "\n"
+        )
+
+    try:
+        TableLayout(())
+    except ValueError:
+        pass
+    else:
+        assert False
+
+    try:
+        TableLayout((1,), line_break_symbol="")
+    except ValueError:
+        pass
+    else:
+        assert False
+
+    # A subtable wider than its column is clipped
+    sub_table = Table([("aaaa", "bbbb", "cccc", "dddd")], name="S")
+    assert (
+        TableLayout((3, 3)).render([(1, sub_table)])
+        == """
++-----+-----+
+|   1 | +--…|
+|     | |  …|
+|     | +--…|
+|     | | a…|
+|     | +--…|
++-----+-----+
+""".strip()
+    )
+    assert (
+        TableLayout((3, 3), max_height=2).render([(1, sub_table)])
+        == """
++-----+-----+
+|   1 | +--…|
+|     | |  …|
++-----+-----+
+""".strip()
+    )
+
+
+def test_sub_table_cache():
+    inner = Table([("a", "b"), ("c", Table([("d",)]))])
+    table = [(inner, "1"), ("2", inner), (inner, "3")]
+    expected = stringify_table(table, max_width=(9, 9))
+
+    cache = SubTableCache()
+    assert stringify_table(table, max_width=(9, 9), sub_table_cache=cache) == expected
+    # The subtable is measured once and rendered once for each width
+    assert set(cache.stats) == {inner, inner.table[1][1]}
+    assert len(cache.lines) == 2
+    hits = cache.hits
+    assert hits > 0
+
+    # A cache passed explicitly is reused between calls
+    assert stringify_table(table, max_width=(9, 9), sub_table_cache=cache) == expected
+    assert len(cache.lines) == 2
+    assert cache.hits > hits
+
+    cache.clear()
+    assert (cache.hits, cache.misses, cache.stats, cache.lines) == (0, 0, {}, {})
+
+
+def test_max_chars():
+    assert (
+        stringify_table([("0123456789", 12345, "abc")], max_chars=(4, 3, None))
+        == """
++------+-----+-----+
+| 0123…| 123…| abc |
++------+-----+-----+
+""".strip()
+    )
+    assert (
+        stringify_table([("0123456789abcdef",)], max_width=8, max_chars=12)
+        == """
++------+
+| 0123/|
+| 4567/|
+| 89ab…|
++------+
+""".strip()
+    )
+    assert (
+        stringify_table([("a", Table([("0123456789",)], max_chars=3))])
+        == """
++---+-----+
+| a | 012…|
++---+-----+
+""".strip()
+    )
+
+    # Only the beginning of a huge value is measured
+    blob = str(list(range(1_000_000)))
+    assert (
+        stringify_table([(blob,)], max_chars=10)
+        == """
++------------+
+| [0, 1, 2, …|
++------------+
+""".strip()
+    )
+
+    # Escape sequences are not cut in half
+    assert stringify_table(
+        [("\x1b[31m0123\x1b]8;;https://example.com\x1b\\4567\x1b]8;;\x1b\\\x1b[0m",)],
+        max_chars=12,
+        text_splitter=AnsiTextSplitter(),
+    ) == ("+------+\n| \x1b[31m0123\x1b[0m…|\n+------+")
+
+    try:
+        stringify_table([("a",)], max_chars=(1, 0))
+    except ValueError:
+        pass
+    else:
+        assert False
+
+
+def test_max_rows():
+    rows = [(i, "x" * i) for i in range(1, 11)]
+    # Widths are calculated from the shown rows only
+    assert (
+        stringify_table(rows, max_rows=4, column_names=("id", "text"))
+        == """
++----+------------+
+| id |    text    |
++----+------------+
+|  1 | x          |
++----+------------+
+|  2 | xx         |
++----+------------+
+|  … 6 omitted …  |
++----+------------+
+|  9 | xxxxxxxxx  |
++----+------------+
+| 10 | xxxxxxxxxx |
++----+------------+
+""".strip()
+    )
+    assert (
+        Table(iter(rows), name="Name").stringify(max_rows=3)
+        == """
++-----------------+
+|      Name       |
++----+------------+
+|  1 | x          |
++----+------------+
+|  2 | xx         |
++----+------------+
+|  … 7 omitted …  |
++----+------------+
+| 10 | xxxxxxxxxx |
++----+------------+
+""".strip()
+    )
+    assert (
+        stringify_table(iter(rows), max_rows=1)
+        == """
++---+---+
+| 1 | x |
++---+---+
+| … 9 … |
++-------+
+""".strip()
+    )
+    assert stringify_table(rows, max_rows=10) == stringify_table(rows)
+
+    try:
+        stringify_table(rows, max_rows=0)
+    except ValueError:
+        pass
+    else:
+        assert False
+
+
+def test_width_sample():
+    rows = [(i, "x" * (i % 7)) for i in range(1, 11)]
+    # Longer values outside the sample are wrapped
+    assert (
+        stringify_table(rows[:5], width_sample=2, sep=False)
+        == """
++---+----+
+| 1 | x  |
+| 2 | xx |
+| 3 | xx/|
+|   | x  |
+| 4 | xx/|
+|   | xx |
+| 5 | xx/|
+|   | xx/|
+|   | x  |
++---+----+
+""".strip()
+    )
+    assert (
+        stringify_table(rows, width_sample=WidthSample(3, "quantiles"), sep=False)
+        == """
++----+-------+
+|  1 | x     |
+|  2 | xx    |
+|  3 | xxx   |
+|  4 | xxxx  |
+|  5 | xxxxx |
+|  6 | xxxxx/|
+|    | x     |
+|  7 |       |
+|  8 | x     |
+|  9 | xx    |
+| 10 | xxx   |
++----+-------+
+""".strip()
+    )
+    assert WidthSample(3, "quantiles").select(rows) == [rows[0], rows[4], rows[9]]
+    assert WidthSample(4, "random", seed=1).select(rows) == WidthSample(
+        4, "random", seed=1
+    ).select(rows)
+    assert stringify_table(rows, width_sample=10) == stringify_table(rows)
+    # Rows outside the sample can have more columns
+    assert (
+        stringify_table([(1,), (2, 3)], width_sample=1)
+        == "+---+\n| 1 |\n+---+\n| 2 |\n+---+"
+    )
+
+    # A subtable outside the sample that is wider than its column is clipped
+    sub_table_rows = [(1, "x"), (2, Table([("aaaa", "bbbb")]))]
+    for ignore_width_errors in (False, True):
+        assert (
+            stringify_table(
+                sub_table_rows, width_sample=1, ignore_width_errors=ignore_width_errors
+            )
+            == """
++---+---+
+| 1 | x |
++---+---+
+| 2 | +…|
+|   | |…|
+|   | +…|
++---+---+
+""".strip()
+        )
+    # The same subtable in the sample widens its column
+    assert stringify_table(sub_table_rows, width_sample=2) == stringify_table(
+        sub_table_rows
+    )
+
+    for kwargs in ({"size": 0}, {"strategy": "tail"}):
+        try:
+            WidthSample(**kwargs)
+        except ValueError:
+            pass
+        else:
+            assert False
+
+    try:
+        list(iter_table_lines(rows, width_sample=2, stream=True))
+    except ValueError:
+        pass
+    else:
+        assert False
+
+
+def test_workers():
+    rows = [
+        (i, "text " * (i % 5), Table([(i, "a\nb")]) if i % 3 else i / 3)
+        for i in range(50)
+    ]
+    kwargs = {
+        "column_names": ("id", "text", "table"),
+        "name": "Name",
+        "max_width": 40,
+        "sep": range(0, 50, 4),
+        "theme": Themes.thin_double,
+    }
+    # The chunks are stitched back in the order of the rows
+    assert stringify_table(rows, workers=2, **kwargs) == stringify_table(rows, **kwargs)
+    layout = TableLayout.from_table(rows, **kwargs)
+    assert list(layout.iter_lines(rows, workers=3, chunk_size=7)) == list(
+        layout.iter_lines(rows)
+    )
+
+    try:
+        stringify_table(rows, workers=0)
+    except ValueError:
+        pass
+    else:
+        assert False
+
+
+def test_thread_safety():
+    sub_table = Table([(1, "\x1b[31mred\x1b[0m"), (2, "a\nb")], name="Sub")
+    width_cache = WidthCache(maxsize=64)
+    layout = TableLayout((3, 10), column_names=("id", "text"))
+    tables = [
+        [(i, "\x1b[1mbold\x1b[0m " * i, sub_table) for i in range(6)],
+        [("字" * i, i / 7, "\n" * (i % 3)) for i in range(8)],
+        Table([(i, sub_table) for i in range(4)], name="Table", max_height=4),
+    ]
+    kwargs_list = [
+        {},
+        {"max_width": 30, "theme": Themes.rounded_thick},
+        {"sep": (1, 3), "width_cache": width_cache},
+    ]
+
+    def render_all() -> list[str]:
+        strings = [
+            (
+                table.stringify(**kwargs)
+                if isinstance(table, Table)
+                else stringify_table(table, text_splitter=AnsiTextSplitter(), **kwargs)
+            )
+            for table in tables
+            for kwargs in kwargs_list
+        ]
+        strings.append(layout.render([(i, "x" * i) for i in range(12)]))
+        return strings
+
+    expected = render_all()
+    results: list[list[str]] = []
+    barrier = threading.Barrier(32)
+
+    def worker():
+        barrier.wait()
+        for _ in range(5):
+            results.append(render_all())
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=worker) for _ in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert len(results) == 32 * 5
+    assert all(result == expected for result in results)
+
+    assert render_many(tables * 10, workers=8, max_width=30) == [
+        table.stringify(max_width=30) if isinstance(table, Table)
+        # The default splitter of stringify_table
+        else stringify_table(table, max_width=30)
+        for table in tables * 10
+    ]
+
+
+def test_split_columns():
+    rows = [("id", "a" * 10, "b" * 10, "c" * 10), (2, "x", "y", "z")]
+    assert (
+        stringify_table(
+            rows,
+            max_width=30,
+            split_columns=True,
+            repeat_columns=(0,),
+            column_names=("#", "A", "B", "C"),
+            h_align=("<", ">"),
+        )
+        == """
++---------+------------------+
+|    #    |        A         |
++---------+------------------+
+| id      |       aaaaaaaaaa |
++---------+------------------+
+| 2       |                x |
++---------+------------------+
+
++---------+------------------+
+|    #    |        B         |
++---------+------------------+
+| id      | bbbbbbbbbb       |
++---------+------------------+
+| 2       | y                |
++---------+------------------+
+
++---------+------------------+
+|    #    |        C         |
++---------+------------------+
+| id      | cccccccccc       |
++---------+------------------+
+| 2       | z                |
++---------+------------------+
+""".strip()
+    )
+    # A table that fits is not split
+    assert stringify_table(rows, max_width=80, split_columns=True) == stringify_table(
+        rows, max_width=80
+    )
+    assert get_column_panels([2, 10, 10, 10], 30, (0,)) == [(0, 1), (0, 2), (0, 3)]
+    assert get_column_panels([2, 10, 10, 10], 80) == [(0, 1, 2, 3)]
+    # A column wider than max_width gets its own table
+    assert get_column_panels([50, 2, 2], 20) == [(0,), (1, 2)]
+
+    for kwargs in ({"stream": True}, {"repeat_columns": (4,)}):
+        try:
+            list(iter_table_lines(rows, max_width=30, split_columns=True, **kwargs))
+        except ValueError:
+            pass
+        else:
+            assert False
+
+
+def test_table_paginator():
+    rows = [(i, "x" * i) for i in range(1, 8)]
+    paginator = TablePaginator(
+        rows, page_size=3, column_names=("id", "text"), max_width=(2, 4), sep=(2,)
+    )
+    assert paginator.page_count == 3
+    # The separators are chosen by the index of the row in the whole table
+    assert (
+        paginator.render_page(0)
+        == """
++----+------+
+| id | text |
++----+------+
+|  1 | x    |
+|  2 | xx   |
++----+------+
+|  3 | xxx  |
++----+------+
+""".strip()
+    )
+    assert (
+        paginator.render_page(2)
+        == """
++----+------+
+| id | text |
++----+------+
+|  7 | xxxx/|
+|    | xxx  |
++----+------+
+""".strip()
+    )
+    assert paginator.render_page(1) == "\n".join(paginator.iter_page_lines(1))
+    # Only the rows of the page are formatted
+    assert paginator.row_heights == []
+
+    class Rows(list):
+        def __getitem__(self, index):
+            read_rows.append(index)
+            return super().__getitem__(index)
+
+    read_rows: list[int] = []
+    big_paginator = TablePaginator(Rows([(i, "x") for i in range(1000)]), page_size=3)
+    read_rows.clear()
+    assert big_paginator.get_page_rows(300) == range(900, 903)
+    assert big_paginator.page_count == 334
+    assert read_rows == []
+    big_paginator.render_page(300)
+    assert read_rows == [900, 901, 902]
+
+    for page in (-1, 3):
+        try:
+            paginator.render_page(page)
+        except IndexError:
+            pass
+        else:
+            assert False
+
+    # Pages with at most 9 lines. The heights are indexed by the constructor
+    paginator = TablePaginator(rows, page_height=9, max_width=(2, 4))
+    assert paginator.row_heights == [1, 1, 1, 1, 2, 2, 2]
+    assert paginator.page_bounds == [0, 4, 6, 7]
+    assert paginator.page_count == 3
+    assert paginator.render_page(0) == stringify_table(rows[:4], max_width=(2, 4))
+    assert (
+        paginator.render_page(1)
+        == """
++----+------+
+|  5 | xxxx/|
+|    | x    |
++----+------+
+|  6 | xxxx/|
+|    | xx   |
++----+------+
+""".strip()
+    )
+
+    try:
+        TablePaginator(rows, page_size=0)
+    except ValueError:
+        pass
+    else:
+        assert False
@@ -70,6 +70,98 @@ def test_split_text():
     )
 
 
+def test_split_text_wide_characters():
+    assert split_text("1\U0001f34f23", 2) == (
+        ["1\U0001f34f", "23"],
+        ["/", " "],
+        False,
+        {},
+    )
+    assert split_text("12\u03083", 2) == (
+        ["12", "\u03083"],
+        ["/", " "],
+        False,
+        {},
+    )
+    assert split_text("\x01\u200b12\x7f3", 2) == (
+        ["\x01\u200b12", "\x7f3"],
+        ["/", " "],
+        False,
+        {},
+    )
+    # The last character does not fit, but nothing is left for the next line
+    assert split_text("1\U0001f34f", 2) == (["1\U0001f34f"], ["/"], False, {})
+    assert split_text("12\U0001f34f", 2) == (
+        ["12", "\U0001f34f"],
+        ["/", " "],
+        False,
+        {},
+    )
+
+
+def test_split_text_long_line():
+    lines, symbols, _, _ = split_text("0123456789" * 10_000, 7)
+    assert len(lines) == 14_286
+    assert lines[:3] == ["0123456", "7890123", "4567890"]
+    assert lines[-1] == "56789"
+    assert symbols[-2:] == ["/", " "]
+    assert "".join(lines) == "0123456789" * 10_000
+
+
+def test_split_text_height():
+    link = "\x1b]8;;https://example.com\x1b\\"
+    texts = (  # start, repeated part, end
+        ("", "0123456789", ""),
+        ("", "\U0001f34f\u0301 \u6f22", ""),
+        ("", "line\n", ""),
+        ("", f"\x1b[1mbold {link}link\x1b]8;;\x1b\\\x1b[31m", "\x1b[0m"),
+        (f"\x1b[4m{link}", "link ", "\x1b]8;;\x1b\\\x1b[0m"),
+    )
+    for splitter in (BaseTextSplitter(), text_splitter, text_splitter_escape_unsafe):
+        for start, part, end in (
+            texts[:3] if type(splitter) is BaseTextSplitter else texts
+        ):
+            for width, height in ((1, 1), (7, 3), (40, 2)):
+                text = start + part * 100 + end
+                lines, symbols, _, _ = splitter.split_text(text, width)
+                text = start + part * 20_000 + end
+                assert splitter.split_text(text, width, height)[:2] == (
+                    lines[:height],
+                    [*symbols[: height - 1], "…"],
+                )
+
+    assert split_text("\x1b[31m1234\x1b[0m", 2, 2) == (
+        ["\x1b[31m12\x1b[0m", "\x1b[31m34\x1b[0m"],
+        ["/", " "],
+        False,
+        {},
+    )
+    assert split_text("\x1b[31m12345\x1b[0m", 2, 2)[:2] == (
+        ["\x1b[31m12\x1b[0m", "\x1b[31m34\x1b[0m"],
+        ["/", "…"],
+    )
+
+    class EscapeCounter(AnsiTextSplitter):
+        def escape_prefix(self, text, width=None):
+            escaped = super().escape_prefix(text, width)
+            escaped_lengths.append(len(escaped))
+            return escaped
+
+    # Only the text of the visible lines is escaped.
+    # The link closed at the end of the text stays a link
+    link = "\x1b]8;;https://example.com\x1b\\"
+    for part, end in (
+        ("\x1b[31mred\x1b[0m\ttab\n", ""),
+        ("\x07bell\n", ""),
+        (" \x1b[31mlink", "\x1b]8;;\x1b\\"),
+    ):
+        text = f"\x1b[4m{link}link{part * 100_000}{end}"
+        escaped_lengths: list[int] = []
+        lines, _, _, _ = EscapeCounter().split_text(text, 10, 2)
+        assert sum(escaped_lengths) < 1000, sum(escaped_lengths)
+        assert lines == split_text_escape_unsafe(text[:1000] + end, 10, 2)[0]
+
+
 def test_color_escape_sequence():
     assert split_text("\x1b[34mbl\nue\x1b[0m text")[0] == [
         "\x1b[34mbl\x1b[0m",
@@ -79,20 +171,20 @@ def test_color_escape_sequence():
     assert split_text("t\x1b[31me\x1b[1mx\x1b[0mt", width=1)[0] == [
         "t",
         "\x1b[31me\x1b[0m",
-        "\x1b[31m\x1b[1mx\x1b[0m",
+        "\x1b[31;1mx\x1b[0m",
         "t",
     ]
     assert split_text("\x1b[32m\x1b[40;1m\x1b[1mtext\n\x1b[0mtext1")[0] == [
-        "\x1b[32m\x1b[40;1m\x1b[1mtext\x1b[0m",
+        "\x1b[32;40;1mtext\x1b[0m",
         "text1",
     ]
     assert split_text("\x1b[32m\x1b[40;1m\x1b[1mtext\x1b[0m\ntex\nt2")[0] == [
-        "\x1b[32m\x1b[40;1m\x1b[1mtext\x1b[0m",
+        "\x1b[32;40;1mtext\x1b[0m",
         "tex",
         "t2",
     ]
     assert split_text("\x1b[32m\x1b[40;1m\x1b[1mtext\x1b[0m\ntext1")[0] == [
-        "\x1b[32m\x1b[40;1m\x1b[1mtext\x1b[0m",
+        "\x1b[32;40;1mtext\x1b[0m",
         "text1",
     ]
     assert split_text("123\x1b[32m123\x1b[32m\x1b[32m\x1b[0mqpow", width=1)[0] == [
@@ -174,6 +266,46 @@ def test_color_escape_sequence():
     )
 
 
+def test_tokenize():
+    assert list(text_splitter.tokenize("")) == []
+    assert list(text_splitter.tokenize("text")) == [("text", "text")]
+    assert list(
+        text_splitter.tokenize(
+            "\x1b[31ma\x1b]8;;https://e.x\x1b\\b\x1b]8;;\x1b\\\x1b[0m\x1b[c"
+        )
+    ) == [
+        ("color", "\x1b[31m"),
+        ("text", "a"),
+        ("link_open", "\x1b]8;;https://e.x\x1b\\"),
+        ("text", "b"),
+        ("link_close", "\x1b]8;;\x1b\\"),
+        ("color", "\x1b[0m"),
+        ("text", "\x1b[c"),
+    ]
+
+
+def test_parse_sgr():
+    parse_sgr = AnsiTextSplitterUnsafe.parse_sgr
+    parse_sgr.cache_clear()
+    assert text_splitter.parse_sgr("\x1b[1;031m") == (
+        ("intensity", "1"),
+        ("foreground", "31"),
+    )
+    assert text_splitter.parse_sgr("\x1b[m") == (("reset", None),)
+    assert text_splitter.parse_sgr("\x1b[38;5;1;48;2;1;2;3m") == (
+        ("foreground", "38;5;1"),
+        ("background", "48;2;1;2;3"),
+    )
+    assert text_splitter.parse_sgr("\x1b[38;5m") is None
+    assert text_splitter.parse_sgr("\x1b[53m") is None
+    # The cache is keyed by the sequence only and shared by all splitters
+    assert AnsiTextSplitter().parse_sgr("\x1b[1;031m") == (
+        ("intensity", "1"),
+        ("foreground", "31"),
+    )
+    assert parse_sgr.cache_info().hits == 1
+
+
 def test_osc_link_escape_sequence():
     assert split_text(
         "#0nk: \x1b]8;;https://example.com\x1b\\Example\x1b]8;;\x1b\\ end", width=3
@@ -220,10 +352,9 @@ def test_osc_link_escape_sequence():
         width=4,
     )[0] == [
         "Link",
-        ": \x1b]8;;https://site.com\x1b\\\x1b[38;2;255;100;100m\x1b[1mRe\x1b]8;;\x1b\\\x1b[0m",
-        "\x1b[38;2;255;100;100m\x1b[1m\x1b]8;;https://site.com\x1b\\d\x1b[0m"
-        "\x1b[4m&\x1b[0m\x1b[9m\x1b[34mBl\x1b]8;;\x1b\\\x1b[0m",
-        "\x1b[9m\x1b[34m\x1b]8;;https://site.com\x1b\\ue\x1b]8;;\x1b\\\x1b[0m T",
+        ": \x1b]8;;https://site.com\x1b\\\x1b[38;2;255;100;100;1mRe\x1b]8;;\x1b\\\x1b[0m",
+        "\x1b[38;2;255;100;100;1m\x1b]8;;https://site.com\x1b\\d\x1b[0;4m&\x1b[0;9;34mBl\x1b]8;;\x1b\\\x1b[0m",
+        "\x1b[9;34m\x1b]8;;https://site.com\x1b\\ue\x1b]8;;\x1b\\\x1b[0m T",
         "ext ",
         "\x1b[3mItal\x1b[0m",
         "\x1b[3mic\x1b[0m!",
@@ -242,10 +373,9 @@ def test_osc_link_escape_sequence():
         " END",
         width=4,
     )[0] == [
-        "@ \x1b]8;;https://a.io\x1b\\\x1b[1m\x1b[31mRe\x1b]8;;\x1b\\\x1b[0m",
-        "\x1b[1m\x1b[31m\x1b]8;;https://a.io\x1b\\\x1b[0m\x1b[32mg\x1b]8;;\x1b\\"
-        "\x1b[3m\x1b[48;2;0;255;0mN\x1b]8;;https://b.io\x1b\\\x1b[0m\x1b[4met\x1b]8;;\x1b\\\x1b[0m",
-        "\x1b[4m\x1b]8;;https://b.io\x1b\\\x1b[0m\x1b[9m\x1b[38;2;255;255;0mX\x1b]8;;\x1b\\\x1b[0m EN",
+        "@ \x1b]8;;https://a.io\x1b\\\x1b[1;31mRe\x1b]8;;\x1b\\\x1b[0m",
+        "\x1b[1;31m\x1b]8;;https://a.io\x1b\\\x1b[0;32mg\x1b]8;;\x1b\\\x1b[3;48;2;0;255;0mN\x1b]8;;https://b.io\x1b\\\x1b[0;4met\x1b]8;;\x1b\\\x1b[0m",
+        "\x1b[4m\x1b]8;;https://b.io\x1b\\\x1b[0;9;38;2;255;255;0mX\x1b]8;;\x1b\\\x1b[0m EN",
         "D",
     ]
     assert split_text(
@@ -285,10 +415,9 @@ def test_osc_link_escape_sequence():
         "s \x1b[38;5;196m\x1b[1m\x1b]8;;https://e.com\x1b\\F\x1b]8;;\x1b\\\x1b[0mu\x1b[0mn!",
         width=3,
     )[0] == [
-        "\x1b]8;;https://a.com\x1b\\\x1b[1mA\x1b]8;;\x1b\\\x1b]8;;https://b.com\x1b\\\x1b[0m\x1b[3mn\x1b]8;;\x1b\\"
-        "\x1b]8;;https://c.com\x1b\\\x1b[0m\x1b[4m\x1b[38;2;255;0;0ms\x1b]8;;\x1b\\\x1b[0m",
-        "\x1b[4m\x1b[38;2;255;0;0m\x1b]8;;https://d.com\x1b\\\x1b[0m\x1b[9m\x1b[48;5;25mI\x1b]8;;\x1b\\\x1b[0ms ",
-        "\x1b]8;;https://e.com\x1b\\\x1b[38;5;196m\x1b[1mF\x1b]8;;\x1b\\\x1b[0mu\x1b[0mn",
+        "\x1b]8;;https://a.com\x1b\\\x1b[1mA\x1b]8;;\x1b\\\x1b]8;;https://b.com\x1b\\\x1b[0;3mn\x1b]8;;\x1b\\\x1b]8;;https://c.com\x1b\\\x1b[0;4;38;2;255;0;0ms\x1b]8;;\x1b\\\x1b[0m",
+        "\x1b[4;38;2;255;0;0m\x1b]8;;https://d.com\x1b\\\x1b[0;9;48;5;25mI\x1b]8;;\x1b\\\x1b[0ms ",
+        "\x1b]8;;https://e.com\x1b\\\x1b[38;5;196;1mF\x1b]8;;\x1b\\\x1b[0mun",
         "!",
     ]
     assert split_text(
@@ -298,12 +427,12 @@ def test_osc_link_escape_sequence():
         "\x1b[35mGH\x1b[0m",
         width=1,
     )[0] == [
-        "\x1b]8;;https://x.com\x1b\\\x1b[1m\x1b[31mA\x1b]8;;\x1b\\\x1b[0m",
-        "\x1b[1m\x1b[31m\x1b]8;;https://x.com\x1b\\\x1b[0m\x1b[3mB\x1b]8;;\x1b\\\x1b[0m",
-        "\x1b[3m\x1b]8;;https://y.com\x1b\\\x1b[4m\x1b[48;2;10;10;10mC\x1b]8;;\x1b\\\x1b[0m",
-        "\x1b[3m\x1b[4m\x1b[48;2;10;10;10m\x1b]8;;https://y.com\x1b\\\x1b[0m\x1b[9mD\x1b]8;;\x1b\\\x1b[0m",
-        "\x1b[9m\x1b[7mE\x1b[0m",
-        "\x1b[9m\x1b[7m\x1b]8;;https://z.com\x1b\\\x1b[0m\x1b[38;2;200;100;50mF\x1b]8;;\x1b\\\x1b[0m",
+        "\x1b]8;;https://x.com\x1b\\\x1b[1;31mA\x1b]8;;\x1b\\\x1b[0m",
+        "\x1b[1;31m\x1b]8;;https://x.com\x1b\\\x1b[0;3mB\x1b]8;;\x1b\\\x1b[0m",
+        "\x1b[3m\x1b]8;;https://y.com\x1b\\\x1b[4;48;2;10;10;10mC\x1b]8;;\x1b\\\x1b[0m",
+        "\x1b[3;4;48;2;10;10;10m\x1b]8;;https://y.com\x1b\\\x1b[0;9mD\x1b]8;;\x1b\\\x1b[0m",
+        "\x1b[9;7mE\x1b[0m",
+        "\x1b[9;7m\x1b]8;;https://z.com\x1b\\\x1b[0;38;2;200;100;50mF\x1b]8;;\x1b\\\x1b[0m",
         "\x1b[35mG\x1b[0m",
         "\x1b[35mH\x1b[0m",
     ]
@@ -314,10 +443,8 @@ def test_osc_link_escape_sequence():
         "\x1b[7m\x1b]8;;https://c.io\x1b\\D\x1b[0m\x1b]8;;\x1b\\E\x1b[35mF\x1b[0m",
         width=3,
     )[0] == [
-        "\x1b]8;;https://a.io\x1b\\\x1b[1m\x1b[31m😎\x1b]8;;\x1b\\"
-        "\x1b]8;;https://b.io\x1b\\\x1b[0m\x1b[3m\x1b[38;2;123;45;67mB\x1b]8;;\x1b\\\x1b[0m",
-        "\x1b[3m\x1b[38;2;123;45;67m\x1b]8;;https://b.io\x1b\\\x1b[0m\x1b[4m"
-        "\x1b[48;5;200mC\x1b[0m\x1b\x1b[7mD\x1b]8;;\x1b\\\x1b[0mE",
+        "\x1b]8;;https://a.io\x1b\\\x1b[1;31m😎\x1b]8;;\x1b\\\x1b]8;;https://b.io\x1b\\\x1b[0;3;38;2;123;45;67mB\x1b]8;;\x1b\\\x1b[0m",
+        "\x1b[3;38;2;123;45;67m\x1b]8;;https://b.io\x1b\\\x1b[0m\x1b[4m\x1b[48;5;200mC\x1b[999m\x1b[0m\x1b\x1b[7mD\x1b]8;;\x1b\\\x1b[0mE",
         "\x1b[35mF\x1b[0m",
     ]
     assert split_text(
@@ -327,10 +454,8 @@ def test_osc_link_escape_sequence():
         "\x1b[7m\x1b]8;;https://c.io\x1b\\D\x1b[0m\x1b]8;;\x1b\\E\x1b[35mF\x1b[0m",
         width=3,
     )[0] == [
-        "\x1b]8;;https://a.io\x1b\\\x1b[1m\x1b[31m😎\x1b]8;;\x1b\\"
-        "\x1b]8;;https://b.io\x1b\\\x1b[0m\x1b[3m\x1b[38;2;123;45;67mB\x1b]8;;\x1b\\\x1b[0m",
-        "\x1b[3m\x1b[38;2;123;45;67m\x1b]8;;https://b.io\x1b\\\x1b[0m\x1b[4m"
-        "\x1b[48;5;200mC\x1b[0m\x1b[7mD\x1b]8;;\x1b\\\x1b[0mE",
+        "\x1b]8;;https://a.io\x1b\\\x1b[1;31m😎\x1b]8;;\x1b\\\x1b]8;;https://b.io\x1b\\\x1b[0;3;38;2;123;45;67mB\x1b]8;;\x1b\\\x1b[0m",
+        "\x1b[3;38;2;123;45;67m\x1b]8;;https://b.io\x1b\\\x1b[0m\x1b[4m\x1b[48;5;200mC\x1b[999m\x1b[0m\x1b[7mD\x1b]8;;\x1b\\\x1b[0mE",
         "\x1b[35mF\x1b[0m",
     ]
     assert split_text(
@@ -339,9 +464,9 @@ def test_osc_link_escape_sequence():
         "\x1b[9m\x1b[35mZ\x1b[0m",
         width=3,
     )[0] == [
-        "\x1b[1m\x1b[38;2;255;0;0mW\x1b]8;;https://link.com\x1b\\中\x1b]8;;\x1b\\\x1b[0m",
+        "\x1b[1;38;2;255;0;0mW\x1b]8;;https://link.com\x1b\\中\x1b]8;;\x1b\\\x1b[0m",
         "\x1b[3mi—\x1b[4m😈\x1b[0m",
-        "\x1b[9m\x1b[35mZ\x1b[0m",
+        "\x1b[9;35mZ\x1b[0m",
     ]
 
     table = Table(
@@ -435,6 +560,27 @@ def test_osc_link_escape_sequence():
     )
 
 
+def test_escape_sequence_across_lines():
+    assert split_text("a\x1b]8;;u\x1b\\\x1b[1mbcdefg\x1b]8;;\x1b\\h\x1b[0m", 3) == (
+        [
+            "a\x1b]8;;u\x1b\\\x1b[1mbc\x1b]8;;\x1b\\\x1b[0m",
+            "\x1b[1m\x1b]8;;u\x1b\\def\x1b]8;;\x1b\\\x1b[0m",
+            "\x1b[1m\x1b]8;;u\x1b\\g\x1b]8;;\x1b\\h\x1b[0m",
+        ],
+        ["/", "/", " "],
+        False,
+        {},
+    )
+
+    lines, symbols, _, _ = split_text(
+        "\n".join(
+            f"\x1b[31m{i}\x1b]8;;u\x1b\\x\x1b]8;;\x1b\\\x1b[0m" for i in range(2000)
+        )
+    )
+    assert len(lines) == 2000
+    assert lines[1999] == "\x1b[31m1999\x1b]8;;u\x1b\\x\x1b]8;;\x1b\\\x1b[0m"
+
+
 def test_wrong_escape_sequence():
     assert split_text(
         "#0\x1b[31mnk: \x1b]8;;https://example.com\x1b\\Example end",
@@ -450,14 +596,7 @@ def test_wrong_escape_sequence():
     assert split_text(
         "#0nk\x1b[0m\x1b[1m\x1b[0m\x1b[0m\x1b[0m\x1b[1m\x1b[0m\x1b[0m\x1b[0m\x1b[0m: Example\x1b]8;;\x1b\\ end",
         width=3,
-    )[0] == [
-        "#0n",
-        "k\x1b[0m: ",
-        "Exa",
-        "mpl",
-        "e e",
-        "nd",
-    ]
+    )[0] == ["#0n", "k: ", "Exa", "mpl", "e e", "nd"]
     assert split_text(
         "before\x1b]8;;https://example.com\x1b\\text\x1b]8;;https://qwerty.com\x1b\\\x1b]8;;\x1b\\after",
         width=4,
@@ -488,9 +627,8 @@ def test_split_text_escape_unsafe():
         "\x1b[7m\x1b]8;;https://c.io\x1b\\D\x1b[0m\x1b]8;;\x1b\\E\x1b[35mF\x1b[0m",
         width=3,
     )[0] == [
-        "\x1b]8;;https://a.io\x1b\\\x1b[1m\x1b[31m😎\x1b]8;;\x1b\\"
-        "\x1b]8;;https://b.io\x1b\\\x1b[0m\x1b[3m\x1b[38;2;123;45;67mB\x1b]8;;\x1b\\\x1b[0m",
-        "\x1b[3m\x1b[38;2;123;45;67m\x1b]8;;https://b.io\x1b\\\x1b[0m\x1b[4m\x1b[48;5;200mC\x1b[0m\\x\x1b]8;;\x1b\\",
+        "\x1b]8;;https://a.io\x1b\\\x1b[1;31m😎\x1b]8;;\x1b\\\x1b]8;;https://b.io\x1b\\\x1b[0;3;38;2;123;45;67mB\x1b]8;;\x1b\\\x1b[0m",
+        "\x1b[3;38;2;123;45;67m\x1b]8;;https://b.io\x1b\\\x1b[0m\x1b[4m\x1b[48;5;200mC\x1b[999m\x1b[0m\\x\x1b]8;;\x1b\\",
         "\x1b]8;;https://b.io\x1b\\1b\x1b[7mD\x1b]8;;\x1b\\\x1b[0m",
         "E\x1b[35mF\x1b[0m",
     ]
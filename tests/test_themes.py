@@ -1,4 +1,5 @@
 from table2string import Table, Themes, Theme
+from table2string.themes import translate_border_dict
 
 
 def test_themes():
@@ -488,3 +489,33 @@ bottom_horizontal_plus='┴'), Themes.thin)
     assert Themes.get("thin") == Themes.thin
     assert Themes.get("th1n", Themes.rounded) == Themes.rounded
     assert Themes.get("get") == Themes.ascii_thin
+
+
+def test_junctions():
+    assert Themes.thin_double.junctions[("border_top", "─", "┬")] == "┬"
+    assert Themes.thin_double.junctions[("border_bottom", "┬", "┴")] == "┼"
+    # "+" is every junction of ascii_thin, but get_border_name calls it central
+    assert ("border_top", "+", "+") not in Themes.ascii_thin.junctions
+    assert Themes.ascii_thin.junctions[("border_top", "-", "+")] == "+"
+
+    for theme in (
+        Themes.ascii_thin,
+        Themes.thin_thick,
+        Themes.rounded_double,
+        Themes.booktabs,
+        Themes.markdown,
+    ):
+        border = theme.border
+        characters = set(vars(border).values()) | {" ", "x"}
+        for side in ("border_left", "border_right", "border_top", "border_bottom"):
+            for border_from in characters:
+                for border_to in characters:
+                    name = translate_border_dict[side].get(
+                        (
+                            border.get_border_name(border_from) or "",
+                            border.get_border_name(border_to) or "",
+                        )
+                    )
+                    assert theme.junctions.get(
+                        (side, border_from, border_to), border_from
+                    ) == (getattr(border, name) if name else border_from)
@@ -1,10 +1,33 @@
-from table2string.table2string import Table, get_column_widths
-from table2string.themes import Themes
+from decimal import Decimal
+
+from table2string.table2string import (
+    Table,
+    ColumnStats,
+    get_column_stats,
+    get_column_widths,
+)
+from table2string.themes import Theme, Themes
+from table2string.text_splitters import BaseTextSplitter
 from table2string.utils import (
     get_text_width_in_console,
+    get_char_width,
+    is_narrow_text,
+    CharWidthTable,
+    is_number,
+    is_number_text,
+    cut_text_by_width,
+    wrap_line,
+    WidthCache,
+    WidthCacheInfo,
+    set_width_cache,
+    get_width_cache,
+    use_width_cache,
     split_text_for_sub_table,
     proportional_change,
+    add_in_passes,
+    subtract_in_passes,
     apply_border_data,
+    generate_borders,
     transform_align,
     transform_width,
     terminal_size,
@@ -17,6 +40,133 @@ def test_get_text_width_in_console():
     assert get_text_width_in_console("123") == 3
     assert get_text_width_in_console("\U0001f34f\U0001f34e") == 4
     assert get_text_width_in_console("\u0308") == 0
+    assert get_text_width_in_console("") == 0
+    assert get_text_width_in_console("caf\xe9") == 4
+    assert get_text_width_in_console("\x1b[31m12\x1b[0m") == 2
+    assert get_text_width_in_console("\x1b]8;;https://a.io\x1b\\1\x1b]8;;\x1b\\") == 1
+    assert get_text_width_in_console("1\u200b\x7f\x9f2") == 2
+
+
+def test_is_narrow_text():
+    assert is_narrow_text("")
+    assert is_narrow_text("text 123")
+    assert is_narrow_text("caf\xe9 \xa9")
+    assert not is_narrow_text("\x1b[31m")
+    assert not is_narrow_text("\x85")
+    assert not is_narrow_text("e\u0308")
+    assert not is_narrow_text("\U0001f34f")
+
+
+def test_char_width_table():
+    char_widths = CharWidthTable(maxsize=2)
+    assert [char_widths[char] for char in "\u0308\U0001f34f\u0416\u4e00"] == [
+        0,
+        2,
+        1,
+        2,
+    ]
+    # Characters after the first maxsize are not stored
+    assert char_widths == {"\u0308": 0, "\U0001f34f": 2}
+
+
+def test_get_char_width():
+    assert get_char_width("1") == 1
+    assert get_char_width("\U0001f34f") == 2
+    assert get_char_width("\u0308") == 0
+    assert get_char_width("\u200b") == 0
+    assert get_char_width("\x1b") == 0
+
+
+def test_wrap_line():
+    assert wrap_line("123", 3) == ["123"]
+    assert wrap_line("12345", 2) == ["12", "34", "5"]
+    assert wrap_line("1\U0001f34f\U0001f34f", 2) == ["1\U0001f34f", "\U0001f34f"]
+    assert wrap_line("12\x1b[0m3", 2) == ["12", "\x1b[0m3"]
+    assert wrap_line("12345", 2, max_parts=2) == ["12", "34"]
+    assert wrap_line("12345", 2, max_parts=5) == ["12", "34", "5"]
+    assert wrap_line("1\U0001f34f" * 1000, 2, max_parts=1) == ["1\U0001f34f"]
+    assert (
+        wrap_line("12\x1b[0m3" * 3, 2, max_parts=2)
+        == wrap_line("12\x1b[0m3" * 3, 2)[:2]
+    )
+
+
+def test_cut_text_by_width():
+    assert cut_text_by_width("123", 5) == "123"
+    assert cut_text_by_width("123", 0) == "1"
+    assert get_text_width_in_console(cut_text_by_width("1" * 10_000, 100)) > 100
+    assert len(cut_text_by_width("\U0001f34f" * 10_000, 100)) < 10_000
+
+
+def test_width_cache():
+    cache = WidthCache(maxsize=2)
+    assert get_width_cache() is None
+
+    with use_width_cache(cache):
+        assert get_width_cache() is cache
+        assert get_text_width_in_console("\U0001f34f") == 2
+        assert get_text_width_in_console("\U0001f34f") == 2
+        assert get_text_width_in_console("text") == 4  # not cached
+        assert get_text_width_in_console("\u0442\u0435\u043a\u0441\u0442") == 5
+        assert get_text_width_in_console("\x1b[31m1") == 1
+
+    assert get_width_cache() is None
+    assert cache.info() == WidthCacheInfo(
+        hits=1, misses=3, evictions=1, maxsize=2, currsize=2
+    )
+
+    set_width_cache(cache)
+    try:
+        assert get_width_cache() is cache
+        Table([("\U0001f34f", "\x1b[31m1")]).stringify()
+        assert cache.hits > 1
+    finally:
+        set_width_cache(None)
+
+    cache.clear()
+    assert cache.info() == WidthCacheInfo(
+        hits=0, misses=0, evictions=0, maxsize=2, currsize=0
+    )
+
+    other_cache = WidthCache()
+    Table([("\U0001f34f",)]).stringify(width_cache=other_cache)
+    assert other_cache.misses == 1
+    assert cache.misses == 0
+
+    try:
+        WidthCache(maxsize=0)
+    except ValueError:
+        pass
+
+
+def test_is_number():
+    assert is_number(1)
+    assert is_number(1.5)
+    assert is_number(float("nan"))
+    assert is_number(Decimal("1E+2"))
+    assert not is_number(Decimal("sNaN"))
+    assert not is_number(True)
+    assert not is_number("1")
+    assert not is_number(None)
+
+    assert is_number_text("1")
+    assert is_number_text(" -1.5e3\n \n ")
+    assert is_number_text("1_000")
+    assert is_number_text("٣")
+    assert is_number_text(" -Infinity ")
+    assert is_number_text("nan")
+    assert not is_number_text("1\n2")
+    assert not is_number_text("in")
+    assert not is_number_text("abc")
+    assert not is_number_text("")
+    assert not is_number_text(" ")
+
+    line = ((["12"],), ([" "],), (False,), ({},), (4,), ("*",), ("^",))
+    assert fill_line(*line) == "|   12 |"
+    assert fill_line(*line, numbers=(False,)) == "|   12 |"
+    line = ((["ab"],), ([" "],), (False,), ({},), (4,), ("*",), ("^",))
+    assert fill_line(*line) == "| ab   |"
+    assert fill_line(*line, numbers=(True,)) == "|   ab |"
 
 
 def test_proportional_change():
@@ -51,6 +201,28 @@ def test_proportional_change():
     assert proportional_change((1, 1, 1), 16, (1, 9, 6)) == (1, 9, 6)
     assert proportional_change((987654, 10000, 999999), 16, (1, 9, 1)) == (3, 9, 4)
 
+    # Wide tables
+    row_widths = tuple(range(1, 1001))
+    min_row_widths = (2,) * 1000
+    for max_width in (2000, 2001, 123_456, 10**7):
+        widths = proportional_change(row_widths, max_width, min_row_widths)
+        assert sum(widths) == max_width
+        assert min(widths) >= 2
+
+
+def test_add_in_passes():
+    assert add_in_passes([1, 1, 1], 0) == [1, 1, 1]
+    assert add_in_passes([1, 5, 1], 2) == [2, 6, 1]
+    assert add_in_passes([1, 5, 1], 7) == [4, 7, 3]
+
+
+def test_subtract_in_passes():
+    assert subtract_in_passes([5, 5, 5], (1, 1, 1), 4) == [3, 4, 4]
+    # The values at the minimum are skipped
+    assert subtract_in_passes([2, 9, 3], (2, 1, 1), 4) == [2, 7, 1]
+    assert subtract_in_passes([2, 9, 3], (2, 1, 1), 7) == [2, 4, 1]
+    assert subtract_in_passes([2, 9, 3], (2, 1, 1), 10) == [2, 1, 1]
+
 
 def test_transform_align():
     assert transform_align(2, "*") == ("*", "*")
@@ -377,6 +549,38 @@ def test_get_column_widths():
     ) == (9, 1)
 
 
+def test_get_column_stats():
+    assert get_column_stats([("123", "")]) == ColumnStats((3, 1), (1, 1))
+    assert get_column_stats([("12\n3456", 1.5)]) == ColumnStats((4, 3), (1, 1))
+    assert get_column_stats(
+        [("123", "q")], column_names=("c", "column")
+    ) == ColumnStats((3, 6), (1, 1))
+    assert get_column_stats(
+        [("123", Table([("111", "222"), ("333", "444")]))],
+        column_names=("c", "c"),
+    ) == ColumnStats((3, 9), (1, 5))
+
+    class Value:
+        def __str__(self):
+            return "first\nsecond"
+
+    row = (None, True, Decimal("1.50"), Value())
+    assert get_column_stats([row]) == ColumnStats((4, 4, 4, 6), (1, 1, 1, 1))
+
+    class TypeSplitter(BaseTextSplitter):
+        def clear_formatting(self, text):
+            return type(text).__name__
+
+    # clear_formatting gets the cells themselves, not their str()
+    assert get_column_stats([row], splitters=(TypeSplitter(),) * 4) == ColumnStats(
+        (8, 4, 7, 5), (1, 1, 1, 1)
+    )
+    # Values cut by max_chars are str
+    assert get_column_stats(
+        [row], splitters=(TypeSplitter(),) * 4, max_chars=(None, None, 2, None)
+    ) == ColumnStats((8, 4, 3, 5), (1, 1, 1, 1))
+
+
 def test_apply_v_align():
     assert apply_v_align(["a", "", " "], "^") == ["a", " ", " "]
     assert apply_v_align(["", "a", " "], "^") == [" ", "a", " "]
@@ -417,6 +621,22 @@ def test_apply_border_data():
     )
 
 
+def test_generate_borders():
+    theme = Theme("test", Themes.thin_double.border)
+    borders = generate_borders(theme, (1, 3))
+    assert borders == (
+        "┌─────────┐",
+        "├───┬─────┤",
+        "┌───┬─────┐",
+        "├───┼─────┤",
+        "╞═══╪═════╡",
+        "└───┴─────┘",
+    )
+    # Cached in the theme by the widths
+    assert generate_borders(theme, (1, 3)) is borders
+    assert list(theme.border_strings) == [(1, 3)]
+
+
 def test_split_text_for_sub_table():
     assert (
         split_text_for_sub_table(